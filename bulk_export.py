@@ -0,0 +1,60 @@
+"""Bulk export and import of prices, inventories and sales history"""
+import glob
+import os
+from collections import Counter
+
+from columnar_io import INT, STR, open_reader, open_writer
+from pq_files import (INVENTORY_PATTERN, INVENTORY_SUFFIX, SALES_LEDGER_PATTERN,
+                      iter_inventory_items, trader_from_path)
+
+PRICE_COLUMNS = [('item', STR), ('price', INT)]
+INVENTORY_COLUMNS = [('trader', STR), ('slot', STR), ('item', STR), ('item_id', STR)]
+SALES_COLUMNS = [('timestamp', INT), ('trader', STR), ('item', STR), ('item_id', STR), ('price', INT)]
+
+def export_prices(prices, path):
+    """Write an {item: copper price} mapping and return the row count"""
+    with open_writer(path, PRICE_COLUMNS) as writer:
+        writer.write_rows(sorted(prices.items()))
+        return writer.rows_written
+
+def export_inventories(folder, path):
+    """Write the trader satchel contents of every inventory dump in a folder"""
+    with open_writer(path, INVENTORY_COLUMNS) as writer:
+        for inventory_path in sorted(glob.glob(os.path.join(folder, INVENTORY_PATTERN))):
+            trader = trader_from_path(inventory_path, INVENTORY_SUFFIX)
+            writer.write_rows((trader, slot, item_name, item_id)
+                              for slot, item_name, item_id in iter_inventory_items(inventory_path))
+        return writer.rows_written
+
+def export_sales(folder, path):
+    """Concatenate every trader's sales ledger in a folder"""
+    with open_writer(path, SALES_COLUMNS) as writer:
+        for ledger_path in sorted(glob.glob(os.path.join(folder, SALES_LEDGER_PATTERN))):
+            with open_reader(ledger_path, SALES_COLUMNS) as reader:
+                writer.write_rows(reader.iter_rows())
+        return writer.rows_written
+
+def sales_counts(folder):
+    """Count units sold per item across every sales ledger in a folder"""
+    counts = Counter()
+    for ledger_path in glob.glob(os.path.join(folder, SALES_LEDGER_PATTERN)):
+        with open_reader(ledger_path, [('item', STR)]) as reader:
+            for block in reader.iter_blocks():
+                counts.update(block['item'])
+    return counts
+
+def export_all(folder, prices, out_dir, suffix):
+    """Export prices, inventories and sales into out_dir; returns {path: rows}"""
+    results = {}
+    for name, export in (('pq_prices', lambda path: export_prices(prices, path)),
+                         ('pq_inventory', lambda path: export_inventories(folder, path)),
+                         ('pq_sales', lambda path: export_sales(folder, path))):
+        path = os.path.join(out_dir, name + suffix)
+        results[path] = export(path)
+    return results
+
+def iter_price_blocks(path):
+    """Yield {item: copper price} chunks read from a price export"""
+    with open_reader(path, PRICE_COLUMNS) as reader:
+        for block in reader.iter_blocks():
+            yield {item: price for item, price in zip(block['item'], block['price']) if price >= 0}
@@ -1,9 +1,30 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 import os
-import re
 import glob
+import time
 from collections import defaultdict
+from datetime import datetime
+
+from pq_files import (BZR_PATTERN, INVENTORY_PATTERN, INVENTORY_SUFFIX, bzr_filename, count_satchel_slots,
+                      inventory_filename, iter_inventory_items, parse_bzr_items, trader_from_bzr_path,
+                      trader_from_path, write_bzr_items)
+from price_book import PRICE_BOOK_FILENAME, PriceBook, projection_digest
+from bulk_export import export_all, iter_price_blocks, sales_counts
+from trader_planner import WEIGHT_MODES, WEIGHT_SELL_THROUGH, WEIGHT_VALUE, holdings, plan_distribution, stock_counts
+from market_data import load_market_index, recommend_undercuts
+from bzr_watcher import POLL_INTERVAL_MS, BzrWatcher
+from price_journal import (SOURCE_AUTO_SYNC, SOURCE_IMPORT, SOURCE_MANUAL, SOURCE_MARKET, SOURCE_NAMES, SOURCE_SYNC,
+                           PriceJournal)
+from columnar_io import COLUMNAR_SUFFIX, CSV_SUFFIX
+from warm_cache import file_fingerprint, load_cache, save_cache
+
+EXPORT_FORMATS = {"CSV": CSV_SUFFIX, "Columnar": COLUMNAR_SUFFIX}
+DEFAULT_TRADER_SLOTS = 80  # 8 trader satchels of 10 slots
+MARKET_OFF = "Off"
+MARKET_RECOMMEND = "Recommend"
+MARKET_APPLY = "Apply"
+MARKET_MODES = (MARKET_OFF, MARKET_RECOMMEND, MARKET_APPLY)
 
 class BZRSyncApp:
     def __init__(self, root):
@@ -14,10 +35,26 @@ class BZRSyncApp:
         # Variables
         self.folder_path = tk.StringVar()
         self.trader_name = tk.StringVar()
+        self.reprice_item_name = tk.StringVar()
+        self.reprice_price = tk.StringVar()
+        self.export_format = tk.StringVar(value="CSV")
+        self.distribute_traders = tk.StringVar()
+        self.distribute_slots = tk.StringVar()
+        self.distribute_mode = tk.StringVar(value=WEIGHT_VALUE)
+        self.market_mode = tk.StringVar(value=MARKET_OFF)
+        self.market_index = None
+        self.auto_sync = tk.BooleanVar(value=False)
+        self.watcher = None
+        self.auto_sync_job = None
+        self.held_patches = {}  # mule -> items to patch once its own edit has settled
+        self.price_journal = None
         self.bzr_files = []
         self.synchronized_items = {}
+        self.parsed_files = {}  # file_path -> {'fingerprint': ..., 'items': {item: price}}
+        self.cache_file = "bzr_sync_cache.json"
         
         self.setup_ui()
+        self.warm_start()
     
     def setup_ui(self):
         # Main frame
@@ -44,8 +81,14 @@ class BZRSyncApp:
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=1, column=0, columnspan=3, pady=10)
         
-        ttk.Button(button_frame, text="Synchronize", command=self.synchronize_prices).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(button_frame, text="Clear Log", command=self.clear_log).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Synchronize", command=self.synchronize_prices).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Checkbutton(button_frame, text="Auto-sync", variable=self.auto_sync, command=self.toggle_auto_sync).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Clear Log", command=self.clear_log).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Export", command=self.export_data).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Combobox(button_frame, textvariable=self.export_format, values=list(EXPORT_FORMATS), state="readonly", width=9).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Import prices", command=self.import_prices).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Market data", command=self.load_market_data).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Combobox(button_frame, textvariable=self.market_mode, values=list(MARKET_MODES), state="readonly", width=10).pack(side=tk.LEFT)
         
         # New trader section
         trader_frame = ttk.Frame(main_frame)
@@ -56,6 +99,27 @@ class BZRSyncApp:
         ttk.Entry(trader_frame, textvariable=self.trader_name).grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 10))
         ttk.Button(trader_frame, text="Copy to new trader", command=self.copy_to_new_trader).grid(row=0, column=2)
         
+        # Price book repricing
+        ttk.Label(trader_frame, text="Reprice item:").grid(row=1, column=0, padx=(0, 5), pady=(5, 0))
+        reprice_frame = ttk.Frame(trader_frame)
+        reprice_frame.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=(0, 10), pady=(5, 0))
+        reprice_frame.columnconfigure(0, weight=1)
+        ttk.Entry(reprice_frame, textvariable=self.reprice_item_name).grid(row=0, column=0, sticky=(tk.W, tk.E), padx=(0, 5))
+        ttk.Entry(reprice_frame, textvariable=self.reprice_price, width=10).grid(row=0, column=1, padx=(0, 5))
+        ttk.Button(reprice_frame, text="History", command=self.show_price_history).grid(row=0, column=2)
+        ttk.Button(trader_frame, text="Set price", command=self.reprice_item).grid(row=1, column=2, pady=(5, 0))
+        
+        # Distribution across several traders
+        ttk.Label(trader_frame, text="Distribute to:").grid(row=2, column=0, padx=(0, 5), pady=(5, 0))
+        distribute_frame = ttk.Frame(trader_frame)
+        distribute_frame.grid(row=2, column=1, sticky=(tk.W, tk.E), padx=(0, 10), pady=(5, 0))
+        distribute_frame.columnconfigure(0, weight=1)
+        ttk.Entry(distribute_frame, textvariable=self.distribute_traders).grid(row=0, column=0, sticky=(tk.W, tk.E), padx=(0, 5))
+        ttk.Label(distribute_frame, text="Slots:").grid(row=0, column=1, padx=(0, 5))
+        ttk.Entry(distribute_frame, textvariable=self.distribute_slots, width=5).grid(row=0, column=2, padx=(0, 5))
+        ttk.Combobox(distribute_frame, textvariable=self.distribute_mode, values=list(WEIGHT_MODES), state="readonly", width=12).grid(row=0, column=3)
+        ttk.Button(trader_frame, text="Distribute", command=self.distribute_items).grid(row=2, column=2, pady=(5, 0))
+        
         # File list
         ttk.Label(main_frame, text="Found BZR Files:").grid(row=3, column=0, sticky=tk.W, pady=(10, 5))
         
@@ -76,10 +140,46 @@ class BZRSyncApp:
         self.debug_text = scrolledtext.ScrolledText(main_frame, wrap=tk.WORD, height=15)
         self.debug_text.grid(row=4, column=1, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
     
+    def warm_start(self):
+        """Restore the last folder and parsed files, keeping entries whose files are unchanged"""
+        state = load_cache(self.cache_file, 'bzr_sync')
+        if not state or not os.path.isdir(state.get('folder', '')):
+            return
+        
+        self.folder_path.set(state['folder'])
+        fresh = 0
+        for file_path, entry in state.get('parsed_files', {}).items():
+            if file_fingerprint(file_path) == entry['fingerprint']:
+                self.parsed_files[file_path] = entry
+                fresh += 1
+        if fresh == len(state.get('parsed_files', {})):
+            self.synchronized_items = state.get('synchronized_items', {})
+        
+        self.log_message(f"Restored folder: {state['folder']} ({fresh} cached files unchanged)")
+        self.scan_files()
+    
+    def save_state_cache(self):
+        """Save the folder and parsed files for the next warm start"""
+        if not self.folder_path.get():
+            return
+        try:
+            save_cache(self.cache_file, 'bzr_sync', {
+                'folder': self.folder_path.get(),
+                'parsed_files': self.parsed_files,
+                'synchronized_items': self.synchronized_items,
+            })
+        except Exception as e:
+            self.log_message(f"Error saving cache: {str(e)}")
+    
     def browse_folder(self):
         folder = filedialog.askdirectory()
         if folder:
             self.folder_path.set(folder)
+            self.parsed_files = {}
+            self.price_journal = None
+            if self.auto_sync.get():
+                self.auto_sync.set(False)
+                self.toggle_auto_sync()
             self.log_message(f"Selected folder: {folder}")
     
     def log_message(self, message):
@@ -100,7 +200,7 @@ class BZRSyncApp:
         self.bzr_files = []
         
         # Search for BZR files
-        pattern = os.path.join(self.folder_path.get(), "BZR_*_pq.proj.ini")
+        pattern = os.path.join(self.folder_path.get(), BZR_PATTERN)
         found_files = glob.glob(pattern)
         
         if not found_files:
@@ -117,67 +217,26 @@ class BZRSyncApp:
     
     def parse_bzr_file(self, file_path):
         """Parse a BZR file and extract items from [ItemToSell] section"""
-        items = {}
+        # Files unchanged since they were last parsed or written come from the cache
+        fingerprint = file_fingerprint(file_path)
+        cached = self.parsed_files.get(file_path)
+        if cached and cached['fingerprint'] == fingerprint:
+            return dict(cached['items'])
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Find [ItemToSell] section
-            item_section_match = re.search(r'\[ItemToSell\](.*?)(?=\[|$)', content, re.DOTALL)
-            if not item_section_match:
-                return items
-            
-            item_section = item_section_match.group(1)
-            
-            # Parse item=price lines
-            for line in item_section.strip().split('\n'):
-                line = line.strip()
-                if '=' in line and not line.startswith('['):
-                    item_name, price_str = line.split('=', 1)
-                    try:
-                        price = int(price_str)
-                        items[item_name.strip()] = price
-                    except ValueError:
-                        continue
-            
-            return items
+            items = parse_bzr_items(file_path)
         except Exception as e:
             self.log_message(f"Error parsing {os.path.basename(file_path)}: {str(e)}")
             return {}
+        self.parsed_files[file_path] = {'fingerprint': fingerprint, 'items': items}
+        return dict(items)
     
     def write_bzr_file(self, file_path, items):
         """Update a BZR file with new item prices"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Find [ItemToSell] section
-            item_section_match = re.search(r'(\[ItemToSell\])(.*?)(?=(\[|$))', content, re.DOTALL)
-            if not item_section_match:
-                # If no [ItemToSell] section exists, create one at the end
-                if not content.endswith('\n'):
-                    content += '\n'
-                content += '[ItemToSell]\n'
-                for item, price in items.items():
-                    content += f'{item}={price}\n'
-            else:
-                # Replace the existing section
-                before_section = content[:item_section_match.start()]
-                after_section = content[item_section_match.end():]
-                
-                new_section = '[ItemToSell]\n'
-                for item, price in sorted(items.items()):
-                    new_section += f'{item}={price}\n'
-                
-                # If there's content after, add a newline
-                if after_section and not new_section.endswith('\n'):
-                    new_section += '\n'
-                
-                content = before_section + new_section + after_section
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
+            write_bzr_items(file_path, items)
+            self.parsed_files[file_path] = {'fingerprint': file_fingerprint(file_path), 'items': dict(items)}
+            if self.watcher is not None:
+                self.watcher.note_written(file_path, items)
             return True
         except Exception as e:
             self.log_message(f"Error writing {os.path.basename(file_path)}: {str(e)}")
@@ -235,51 +294,203 @@ class BZRSyncApp:
                     price_info = ", ".join([f"{filename}={price}" for price, filename in price_list])
                     self.log_message(f"  {item}: {price_info} -> Using {lowest_price} from {source_file}")
         
-        # Store synchronized items for potential new trader creation
-        self.synchronized_items = lowest_prices
+        # Fold the results into the price book; the BZR files are generated from it
+        book = self.load_price_book()
+        if book is None:
+            return
         
-        # Update all files
-        self.log_message(f"\nUpdating {len(self.bzr_files)} files...")
+        # Items that are 0 everywhere keep a 0 price; items gone from every file leave the book
+        book_prices = {item: lowest_prices.get(item, 0) for item in all_items}
+        removed = book.remove_prices(book.prices.keys() - all_items.keys())
+        changed = book.update_prices(book_prices)
+        changed.update(removed)
         
-        updates_made = 0
+        mule_items = {}
         for file_path in self.bzr_files:
-            filename = os.path.basename(file_path)
-            current_items = file_items[file_path].copy()
-            original_count = len(current_items)
-            changes_made = False
-            
-            # Update existing items and add new ones
-            for item, target_price in lowest_prices.items():
-                if item in current_items:
-                    if current_items[item] != target_price:
-                        old_price = current_items[item]
-                        current_items[item] = target_price
-                        self.log_message(f"  {filename}: Updated {item} from {old_price} to {target_price}")
-                        changes_made = True
-                else:
-                    current_items[item] = target_price
-                    self.log_message(f"  {filename}: Added {item} = {target_price}")
-                    changes_made = True
-            
-            if changes_made:
-                if self.write_bzr_file(file_path, current_items):
-                    updates_made += 1
-                    new_count = len(current_items)
-                    self.log_message(f"  {filename}: Successfully updated ({original_count} -> {new_count} items)")
-                else:
-                    self.log_message(f"  {filename}: Failed to write file")
+            mule = trader_from_bzr_path(file_path)
+            mule_items[mule] = file_items[file_path]
+            if mule not in book.mules:
+                book.add_mule(mule)
+                self.log_message(f"  Added {mule} to the price book")
+            # Items listed in game on a mule its rule leaves out stay listed there
+            unselected = [item for item in mule_items[mule] if not book.mule_includes(mule, item)]
+            if unselected:
+                book.include_items(mule, unselected)
+            # 0 price items are not spread, so one taken off a mule in game stays off it
+            unlisted = [item for item, price in book.prices.items()
+                        if price == 0 and item not in mule_items[mule] and book.mule_includes(mule, item)]
+            if unlisted:
+                book.forget_items(mule, unlisted)
+        
+        # Optionally undercut what other traders are asking; undercuts are journalled on their own
+        undercuts = {}
+        if self.market_mode.get() != MARKET_OFF:
+            undercuts = book.update_prices(self.apply_market_undercuts(lowest_prices))
+        self.log_message(f"\nPrice book: {len(changed) - len(removed)} prices changed, {len(undercuts)} undercut, "
+                         f"{len(removed)} removed, {len(book.prices)} items total")
+        
+        # Update only the files whose projection differs from what they hold
+        self.log_message(f"\nUpdating {len(self.bzr_files)} files...")
+        
+        written = book.regenerate(mules=list(mule_items), current=mule_items, write_file=self.write_bzr_file)
+        for mule in mule_items:
+            filename = bzr_filename(mule)
+            if mule in written:
+                old_items, new_items = written[mule]
+                self.log_projection_changes(filename, old_items, new_items)
+                self.log_message(f"  {filename}: Successfully updated ({len(old_items)} -> {len(new_items)} items)")
+            elif book.projection(mule) != mule_items[mule]:
+                self.log_message(f"  {filename}: Failed to write file")
             else:
                 self.log_message(f"  {filename}: No changes needed")
+        updates_made = len(written)
+        
+        # Only changes that reached the saved book are journalled
+        if self.save_price_book(book):
+            self.record_price_changes(changed, SOURCE_SYNC)
+            self.record_price_changes(undercuts, SOURCE_MARKET)
+        
+        # Store synchronized items for potential new trader creation
+        self.synchronized_items = {item: price for item, price in book.prices.items() if price > 0}
         
         self.log_message(f"\nSynchronization complete!")
         self.log_message(f"Files processed: {len(self.bzr_files)}")
         self.log_message(f"Files updated: {updates_made}")
         self.log_message(f"Unique items synchronized: {len(lowest_prices)}")
         
+        self.save_state_cache()
+        
         # Show concise summary message
         summary_msg = f"Found {len(lowest_prices)} items with prices in {len(self.bzr_files)} BZR files. All files updated with lowest prices and are now in sync."
         messagebox.showinfo("Synchronization Complete", summary_msg)
     
+    def log_projection_changes(self, filename, old_items, new_items):
+        """Log the per-item differences between a file's old and new listing"""
+        old_items = old_items or {}
+        for item, price in sorted(new_items.items()):
+            if item not in old_items:
+                self.log_message(f"  {filename}: Added {item} = {price}")
+            elif old_items[item] != price:
+                self.log_message(f"  {filename}: Updated {item} from {old_items[item]} to {price}")
+        for item in sorted(old_items.keys() - new_items.keys()):
+            self.log_message(f"  {filename}: Removed {item}")
+    
+    def load_price_book(self):
+        """Load the price book for the selected folder"""
+        try:
+            return PriceBook.load(self.folder_path.get())
+        except Exception as e:
+            self.log_message(f"Error loading price book: {str(e)}")
+            messagebox.showerror("Error", f"Failed to load {PRICE_BOOK_FILENAME}:\n{str(e)}")
+            return None
+    
+    def save_price_book(self, book):
+        try:
+            book.save()
+            return True
+        except Exception as e:
+            self.log_message(f"Error saving price book: {str(e)}")
+            return False
+    
+    def open_price_journal(self):
+        """Return the folder's price journal, opening it on first use; None if it cannot be read"""
+        if self.price_journal is None:
+            try:
+                self.price_journal = PriceJournal.open(self.folder_path.get())
+            except Exception as e:
+                self.log_message(f"Error reading price journal: {str(e)}")
+        else:
+            try:
+                self.price_journal.refresh()  # pick up what the monitor journaled since
+            except Exception as e:
+                self.log_message(f"Error reading price journal: {str(e)}")
+        return self.price_journal
+    
+    def record_price_changes(self, changes, source):
+        """Append {item: (old, new)} price book changes to the folder's price journal"""
+        if not changes or self.open_price_journal() is None:
+            return
+        try:
+            self.price_journal.record(changes, source)
+        except Exception as e:
+            self.log_message(f"Error writing price journal: {str(e)}")
+    
+    def show_price_history(self):
+        """Log the price history of the entered item, or every change of the last week"""
+        if not self.folder_path.get():
+            messagebox.showerror("Error", "Please select a folder first.")
+            return
+        
+        if self.open_price_journal() is None:
+            return
+        
+        item = self.reprice_item_name.get().strip()
+        if item:
+            rows = self.price_journal.history(item)
+            self.log_message(f"\nPrice history of {item}: {len(rows)} changes")
+        else:
+            rows = self.price_journal.changes_between(time.time() - 7 * 24 * 3600)
+            self.log_message(f"\nPrice changes in the last 7 days: {len(rows)}")
+        for timestamp, name, old_price, new_price, source in rows:
+            when = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+            self.log_message(f"  {when} {name}: {old_price} -> {new_price} ({SOURCE_NAMES.get(source, source)})")
+    
+    def reprice_item(self):
+        """Change one item's price in the price book and regenerate the files listing it"""
+        if not self.folder_path.get():
+            messagebox.showerror("Error", "Please select a folder first.")
+            return
+        
+        item = self.reprice_item_name.get().strip()
+        if not item:
+            messagebox.showerror("Error", "Please enter an item name.")
+            return
+        
+        try:
+            price = int(self.reprice_price.get().strip())
+            if price < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Please enter the price as a whole number of copper.")
+            return
+        
+        book = self.load_price_book()
+        if book is None:
+            return
+        
+        if item not in book.prices:
+            if not messagebox.askyesno("New Item", f"{item} is not in the price book. Add it?"):
+                return
+        
+        old_price = book.prices.get(item)
+        listing = book.mules_listing(item)
+        mules = book.set_price(item, price)
+        if price == 0 and old_price != price:
+            # 0 price items are not spread, so the item stays on just the mules that listed it
+            for mule in listing:
+                book.include_items(mule, [item])
+            mules = book.mules_listing(item)
+        if not mules and old_price == price:
+            self.log_message(f"\n{item} is already priced at {price}")
+            return
+        
+        self.log_message(f"\nRepriced {item} from {old_price} to {price}")
+        # Only the repriced entry is patched, so other edits made in game stay in the files
+        current = {mule: self.parse_bzr_file(book.mule_file(mule)) for mule in mules if os.path.exists(book.mule_file(mule))}
+        written = book.regenerate(mules=mules, current=current, write_file=self.write_bzr_file, items=[item])
+        for mule in mules:
+            filename = bzr_filename(mule)
+            if mule in written:
+                self.log_message(f"  {filename}: Updated {item} = {price}")
+        self.log_message(f"Files updated: {len(written)} of {len(mules)} listing {item}")
+        
+        if self.save_price_book(book):
+            if old_price != price:
+                self.record_price_changes({item: (old_price, price)}, SOURCE_MANUAL)
+            self.synchronized_items = {item: price for item, price in book.prices.items() if price > 0}
+            self.reprice_price.set("")
+            self.save_state_cache()
+    
     def copy_to_new_trader(self):
         """Create a new BZR file for a new trader with all synchronized items"""
         if not self.folder_path.get():
@@ -291,12 +502,16 @@ class BZRSyncApp:
             messagebox.showerror("Error", "Please enter a trader name.")
             return
         
-        if not self.synchronized_items:
+        book = self.load_price_book()
+        if book is None:
+            return
+        
+        if not book.prices:
             messagebox.showerror("Error", "No synchronized items available. Please run synchronization first.")
             return
         
         # Create filename
-        filename = f"BZR_{trader_name}_pq.proj.ini"
+        filename = bzr_filename(trader_name)
         file_path = os.path.join(self.folder_path.get(), filename)
         
         # Check if file already exists
@@ -304,21 +519,23 @@ class BZRSyncApp:
             if not messagebox.askyesno("File Exists", f"{filename} already exists. Overwrite it?"):
                 return
         
-        self.log_message(f"\nCreating new trader file: {filename}")
-        self.log_message(f"Adding {len(self.synchronized_items)} items with synchronized prices...")
+        if trader_name not in book.mules:
+            book.add_mule(trader_name)
+        items = book.projection(trader_name)
         
-        # Create the new file content
-        content = "[ItemToSell]\n"
-        for item, price in sorted(self.synchronized_items.items()):
-            content += f"{item}={price}\n"
+        self.log_message(f"\nCreating new trader file: {filename}")
+        self.log_message(f"Adding {len(items)} items with synchronized prices...")
+        for item, price in sorted(items.items()):
             self.log_message(f"  {item} = {price}")
         
+        # The new file is generated from the price book like every other mule
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            write_bzr_items(file_path, items)
+            book.projection_digests[trader_name] = projection_digest(items)
+            book.save()
             
             self.log_message(f"\nSuccessfully created {filename}")
-            messagebox.showinfo("Success", f"Created new trader file: {filename}\nAdded {len(self.synchronized_items)} items with synchronized prices.")
+            messagebox.showinfo("Success", f"Created new trader file: {filename}\nAdded {len(items)} items with synchronized prices.")
             
             # Clear the trader name field
             self.trader_name.set("")
@@ -330,10 +547,335 @@ class BZRSyncApp:
         except Exception as e:
             self.log_message(f"Error creating {filename}: {str(e)}")
             messagebox.showerror("Error", f"Failed to create {filename}:\n{str(e)}")
+    
+    def distribute_items(self):
+        """Spread the stocked items over several traders and write all their BZR files"""
+        if not self.folder_path.get():
+            messagebox.showerror("Error", "Please select a folder first.")
+            return
+        
+        folder = self.folder_path.get()
+        self.scan_files()
+        
+        # Blank trader list means every trader that already has a BZR file
+        traders = [name.strip() for name in self.distribute_traders.get().split(',') if name.strip()]
+        if not traders:
+            traders = [trader_from_bzr_path(file_path) for file_path in self.bzr_files]
+        if not traders:
+            messagebox.showerror("Error", "Please enter the traders to distribute to (comma separated).")
+            return
+        
+        slots_text = self.distribute_slots.get().strip()
+        try:
+            fixed_slots = int(slots_text) if slots_text else None
+            if fixed_slots is not None and fixed_slots <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Slots must be a positive whole number.")
+            return
+        
+        book = self.load_price_book()
+        if book is None:
+            return
+        if not book.prices:
+            messagebox.showerror("Error", "No synchronized items available. Please run synchronization first.")
+            return
+        
+        # Capacity comes from the Slots box, else from the trader's own inventory dump
+        capacities = {}
+        for trader in traders:
+            inventory_path = os.path.join(folder, inventory_filename(trader))
+            if fixed_slots is not None:
+                capacities[trader] = fixed_slots
+            elif os.path.exists(inventory_path):
+                capacities[trader] = count_satchel_slots(inventory_path) or DEFAULT_TRADER_SLOTS
+            else:
+                capacities[trader] = DEFAULT_TRADER_SLOTS
+        
+        inventories = {}
+        for inventory_path in glob.glob(os.path.join(folder, INVENTORY_PATTERN)):
+            trader = trader_from_path(inventory_path, INVENTORY_SUFFIX)
+            inventories[trader] = {slot: (item_name, item_id) for slot, item_name, item_id in iter_inventory_items(inventory_path)}
+        stock = stock_counts(inventories) if inventories else None
+        held = holdings(inventories)
+        
+        mode = self.distribute_mode.get()
+        sales = sales_counts(folder) if mode == WEIGHT_SELL_THROUGH else None
+        
+        plan = plan_distribution(book.prices, stock, capacities, mode=mode, sales=sales, held=held)
+        
+        self.log_message("\n" + "="*50)
+        self.log_message(f"Distribution plan ({mode}) across {len(traders)} traders:")
+        self.log_message("="*50)
+        for trader in traders:
+            self.log_message(f"  {trader}: {plan.slots_used(trader)}/{capacities[trader]} slots, "
+                             f"{len(plan.assignments[trader])} items, weight {plan.loads[trader]:.0f}")
+            for item, units in sorted(plan.assignments[trader].items()):
+                self.log_message(f"    {item} x{units}")
+        if plan.unplaced:
+            self.log_message(f"  Did not fit: {sum(plan.unplaced.values())} units of {len(plan.unplaced)} items")
+        if plan.unstocked:
+            self.log_message(f"  Priced but not in any inventory: {len(plan.unstocked)} items")
+        if plan.moves:
+            # An item stays listed on its holder until the move is made and Distribute is run again
+            self.log_message(f"Moves to make in game ({len(plan.moves)}):")
+            for item, source, target, units in plan.moves:
+                self.log_message(f"  Move {item} x{units} from {source} to {target}")
+        
+        if not messagebox.askyesno("Distribute Items", f"Write the BZR files for {len(traders)} traders with this plan?"):
+            return
+        
+        # Traders with nothing planned are left alone; the others keep their rules but stop listing
+        # items planned for another trader, unless they still hold some. Unplanned items stay listed.
+        # Only the planned entries are patched in, so other edits made in game stay in the files
+        planned = {trader: set(plan.assignments[trader]) for trader in traders if plan.assignments[trader]}
+        assigned = set().union(*planned.values())
+        written = {}
+        for trader, items in planned.items():
+            if trader not in book.mules:
+                book.add_mule(trader)
+            keep = items | (assigned & set(held.get(trader, ())))
+            book.include_items(trader, keep)
+            book.exclude_items(trader, assigned - keep)
+            file_path = book.mule_file(trader)
+            current = {trader: self.parse_bzr_file(file_path) if os.path.exists(file_path) else {}}
+            written.update(book.regenerate(mules=[trader], current=current, create=True,
+                                           write_file=self.write_bzr_file, items=sorted(assigned)))
+        for trader in traders:
+            if trader not in planned:
+                self.log_message(f"  {bzr_filename(trader)}: Nothing planned, left unchanged")
+            elif trader in written:
+                self.log_message(f"  {bzr_filename(trader)}: Successfully updated ({len(written[trader][1])} items)")
+            else:
+                self.log_message(f"  {bzr_filename(trader)}: No changes needed")
+        self.save_price_book(book)
+        self.save_state_cache()
+        self.scan_files()
+        
+        messagebox.showinfo("Distribution Complete", f"Planned {len(traders)} traders, files updated: {len(written)}")
+    
+    def toggle_auto_sync(self):
+        """Start or stop watching the folder for price edits"""
+        if self.auto_sync_job is not None:
+            self.root.after_cancel(self.auto_sync_job)
+            self.auto_sync_job = None
+        
+        if not self.auto_sync.get():
+            if self.watcher is not None:
+                self.watcher = None
+                self.log_message("\nAuto-sync stopped")
+            return
+        
+        if not self.folder_path.get():
+            self.auto_sync.set(False)
+            messagebox.showerror("Error", "Please select a folder first.")
+            return
+        
+        self.watcher = BzrWatcher(self.folder_path.get())
+        self.watcher.prime(self.parse_bzr_file)
+        self.held_patches = {}
+        self.log_message(f"\nAuto-sync watching {len(self.watcher.files)} BZR files for price changes")
+        self.auto_sync_job = self.root.after(POLL_INTERVAL_MS, self.poll_auto_sync)
+    
+    def poll_auto_sync(self):
+        """Propagate settled edits, then poll again"""
+        self.auto_sync_job = None
+        if self.watcher is None:
+            return
+        try:
+            changes, edited = self.watcher.poll(time.time(), self.parse_bzr_file)
+            if changes or any(trader_from_bzr_path(path) in self.held_patches for path in edited):
+                self.propagate_price_changes(changes, edited)
+        except Exception as e:
+            self.log_message(f"Auto-sync error: {str(e)}")
+        self.auto_sync_job = self.root.after(POLL_INTERVAL_MS, self.poll_auto_sync)
+    
+    def propagate_price_changes(self, changes, edited):
+        """Push items whose lowest price changed to the other mules that list them"""
+        book = self.load_price_book()
+        if book is None:
+            return
+        
+        changed = book.update_prices(changes)
+        if changed:
+            self.log_message(f"\nAuto-sync: {', '.join(os.path.basename(path) for path in edited)} changed")
+            for item, (old_price, new_price) in sorted(changed.items()):
+                self.log_message(f"  {item}: {old_price} -> {new_price}")
+        
+        # Patch just the changed entries into each file that lists them, plus any held back for a file that just settled
+        patches = defaultdict(set)
+        for item in changed:
+            for mule in book.mules_listing(item):
+                patches[mule].add(item)
+        for path in edited:
+            patches[trader_from_bzr_path(path)].update(self.held_patches.pop(trader_from_bzr_path(path), ()))
+        updates_made = 0
+        for mule, items in sorted(patches.items()):
+            file_path = book.mule_file(mule)
+            if not items or file_path not in self.watcher.files:
+                continue
+            # Writing over an edit still in progress would lose it; patch that file once the edit is read
+            if self.watcher.has_unsettled_edit(file_path):
+                self.held_patches.setdefault(mule, set()).update(items)
+                self.log_message(f"  {bzr_filename(mule)}: Being edited, will update once the edit settles")
+                continue
+            current = {mule: self.parse_bzr_file(file_path)}
+            written = book.regenerate(mules=[mule], current=current, write_file=self.write_bzr_file, items=items)
+            if mule in written:
+                updates_made += 1
+                self.log_message(f"  {bzr_filename(mule)}: Updated")
+        
+        if self.save_price_book(book):
+            self.record_price_changes(changed, SOURCE_AUTO_SYNC)
+        self.synchronized_items = {item: price for item, price in book.prices.items() if price > 0}
+        self.log_message(f"Auto-sync: {len(changed)} prices propagated, files updated: {updates_made}")
+    
+    def load_market_data(self):
+        """Ingest market observation dumps for undercut recommendations"""
+        paths = filedialog.askopenfilenames(title="Select Market Data",
+                                            filetypes=[("Market data", f"*.txt *{CSV_SUFFIX} *{COLUMNAR_SUFFIX}"), ("All files", "*.*")])
+        if not paths:
+            return
+        
+        # Our own mules' listings are not competition
+        own_traders = []
+        if self.folder_path.get():
+            own_traders = [trader_from_bzr_path(path) for path in glob.glob(os.path.join(self.folder_path.get(), BZR_PATTERN))]
+        
+        self.log_message(f"\nLoading market data from {len(paths)} files...")
+        try:
+            self.market_index = load_market_index(paths, ignore_traders=own_traders)
+        except Exception as e:
+            self.log_message(f"Error loading market data: {str(e)}")
+            messagebox.showerror("Error", f"Failed to load market data:\n{str(e)}")
+            return
+        
+        self.log_message(f"Indexed {self.market_index.observations} listings for {len(self.market_index)} items")
+        if self.market_mode.get() == MARKET_OFF:
+            self.market_mode.set(MARKET_RECOMMEND)
+    
+    def apply_market_undercuts(self, prices):
+        """Log undercut recommendations, and apply them when the market mode is Apply"""
+        if self.market_index is None:
+            self.log_message("\nNo market data loaded, skipping undercut recommendations")
+            return prices
+        
+        # Floors come from each item's first journalled price, which applying undercuts never changes
+        floors = {}
+        if self.open_price_journal() is not None:
+            for item in prices:
+                floors[item] = self.price_journal.first_price(item)
+        recommendations = recommend_undercuts(self.market_index, prices, floors=floors)
+        self.log_message(f"\nMarket undercuts for {len(recommendations)} items:")
+        for item, (current, market, recommended) in sorted(recommendations.items()):
+            self.log_message(f"  {item}: ours {current}, market {market} -> {recommended}")
+        
+        if self.market_mode.get() != MARKET_APPLY:
+            return prices
+        prices = dict(prices)
+        for item, (_, _, recommended) in recommendations.items():
+            prices[item] = recommended
+        return prices
+    
+    def export_data(self):
+        """Export the synced prices, inventories and sales history"""
+        if not self.folder_path.get():
+            messagebox.showerror("Error", "Please select a folder first.")
+            return
+        
+        out_dir = filedialog.askdirectory(title="Select Export Folder")
+        if not out_dir:
+            return
+        
+        book = self.load_price_book()
+        if book is None:
+            return
+        prices = book.prices or self.synchronized_items
+        
+        suffix = EXPORT_FORMATS[self.export_format.get()]
+        self.log_message(f"\nExporting to {out_dir}...")
+        try:
+            results = export_all(self.folder_path.get(), prices, out_dir, suffix)
+        except Exception as e:
+            self.log_message(f"Error exporting: {str(e)}")
+            messagebox.showerror("Error", f"Export failed:\n{str(e)}")
+            return
+        
+        for path, rows in results.items():
+            self.log_message(f"  {os.path.basename(path)}: {rows} rows")
+        messagebox.showinfo("Export Complete", f"Exported {len(results)} tables to {out_dir}")
+    
+    def import_prices(self):
+        """Import a price list into the price book and regenerate the BZR files"""
+        if not self.folder_path.get():
+            messagebox.showerror("Error", "Please select a folder first.")
+            return
+        
+        path = filedialog.askopenfilename(title="Select Price List",
+                                          filetypes=[("Price lists", f"*{CSV_SUFFIX} *{COLUMNAR_SUFFIX}"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        self.scan_files()
+        if not self.bzr_files:
+            messagebox.showerror("Error", "No BZR files found in the selected folder.")
+            return
+        
+        book = self.load_price_book()
+        if book is None:
+            return
+        
+        for file_path in self.bzr_files:
+            mule = trader_from_bzr_path(file_path)
+            if mule not in book.mules:
+                book.add_mule(mule)
+        
+        self.log_message(f"\nImporting prices from {os.path.basename(path)}...")
+        rows = 0
+        changed = {}
+        try:
+            for prices in iter_price_blocks(path):
+                rows += len(prices)
+                for item, (old_price, new_price) in book.update_prices(prices).items():
+                    # An item changed by several blocks keeps its price from before the import
+                    changed[item] = (changed[item][0] if item in changed else old_price, new_price)
+        except Exception as e:
+            self.log_message(f"Error importing: {str(e)}")
+            messagebox.showerror("Error", f"Import failed:\n{str(e)}")
+            return
+        
+        self.log_message(f"Read {rows} prices, {len(changed)} changed")
+        
+        # Only the imported entries are patched into the files listing them, so other edits made in game stay
+        patches = defaultdict(list)
+        for item in changed:
+            for mule in book.mules_listing(item):
+                patches[mule].append(item)
+        written = {}
+        for mule, items in sorted(patches.items()):
+            if os.path.exists(book.mule_file(mule)):
+                current = {mule: self.parse_bzr_file(book.mule_file(mule))}
+                written.update(book.regenerate(mules=[mule], current=current, write_file=self.write_bzr_file, items=items))
+        for mule in written:
+            self.log_message(f"  {bzr_filename(mule)}: Successfully updated")
+        if self.save_price_book(book):
+            self.record_price_changes(changed, SOURCE_IMPORT)
+        self.synchronized_items = {item: price for item, price in book.prices.items() if price > 0}
+        self.save_state_cache()
+        
+        messagebox.showinfo("Import Complete", f"Imported {rows} prices ({len(changed)} changed).\nFiles updated: {len(written)}")
 
 def main():
     root = tk.Tk()
     app = BZRSyncApp(root)
+    
+    def on_closing():
+        app.auto_sync.set(False)
+        app.toggle_auto_sync()
+        app.save_state_cache()
+        root.destroy()
+    
+    root.protocol("WM_DELETE_WINDOW", on_closing)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+"""Watch a folder of BZR files and report which items' lowest price changed"""
+import glob
+import os
+from collections import defaultdict
+
+from pq_files import BZR_PATTERN
+from warm_cache import file_fingerprint
+
+DEFAULT_DEBOUNCE = 2.0  # seconds a changed file must stay unchanged before it is read
+POLL_INTERVAL_MS = 1000
+
+class BzrWatcher:
+    def __init__(self, folder, debounce=DEFAULT_DEBOUNCE):
+        self.folder = folder
+        self.debounce = debounce
+        self.files = {}  # path -> (fingerprint, {item: price})
+        self.item_prices = defaultdict(dict)  # item -> {path: price}
+        self.pending = {}  # path -> (fingerprint, time the fingerprint was first seen)
+    
+    def prime(self, parse):
+        """Read the current contents of every BZR file as the baseline"""
+        for path in glob.glob(os.path.join(self.folder, BZR_PATTERN)):
+            fingerprint = file_fingerprint(path)
+            self._set_items(path, fingerprint, parse(path))
+    
+    def note_written(self, path, items):
+        """Record a file the app wrote itself so the write does not trigger a sync"""
+        self._set_items(path, file_fingerprint(path), dict(items))
+        self.pending.pop(path, None)
+    
+    def items(self, path):
+        return dict(self.files.get(path, (None, {}))[1])
+    
+    def has_unsettled_edit(self, path):
+        """True if the file changed on disk since it was last read or written"""
+        return file_fingerprint(path) != self.files.get(path, (None, None))[0]
+    
+    def lowest_price(self, item):
+        """Lowest non-zero price any file lists the item at, 0 if all are 0, None if unlisted"""
+        prices = self.item_prices.get(item)
+        if not prices:
+            return None
+        non_zero = [price for price in prices.values() if price > 0]
+        return min(non_zero) if non_zero else 0
+    
+    def poll(self, now, parse):
+        """Check for settled edits; returns ({item: new lowest price}, [edited paths])"""
+        paths = set(glob.glob(os.path.join(self.folder, BZR_PATTERN))) | set(self.files)
+        settled = []
+        for path in paths:
+            fingerprint = file_fingerprint(path)
+            known = self.files.get(path, (None, None))[0]
+            if fingerprint == known:
+                self.pending.pop(path, None)
+                continue
+            pending = self.pending.get(path)
+            if pending is None or pending[0] != fingerprint:
+                # Changed (again); wait for the writer to finish
+                self.pending[path] = (fingerprint, now)
+            elif now - pending[1] >= self.debounce:
+                settled.append((path, fingerprint))
+        
+        changes = {}
+        for path, fingerprint in settled:
+            del self.pending[path]
+            old_items = self.files.get(path, (None, {}))[1]
+            new_items = parse(path) if fingerprint is not None else {}
+            touched = {item for item in old_items.keys() | new_items.keys() if old_items.get(item) != new_items.get(item)}
+            before = {item: self.lowest_price(item) for item in touched}
+            self._set_items(path, fingerprint, new_items)
+            for item in touched:
+                after = self.lowest_price(item)
+                if after is not None and after != before[item]:
+                    changes[item] = after
+        return changes, [path for path, _ in settled]
+    
+    def _set_items(self, path, fingerprint, items):
+        old_items = self.files.get(path, (None, {}))[1]
+        for item in old_items:
+            if item not in items:
+                prices = self.item_prices[item]
+                prices.pop(path, None)
+                if not prices:
+                    del self.item_prices[item]
+        for item, price in items.items():
+            self.item_prices[item][path] = price
+        if fingerprint is None:
+            self.files.pop(path, None)
+        else:
+            self.files[path] = (fingerprint, items)
@@ -0,0 +1,249 @@
+"""Streaming column-oriented readers and writers"""
+import csv
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+# A .pqc file is the magic, a JSON schema header and zlib blocks of int64 and dictionary-encoded str columns
+COLUMNAR_MAGIC = b'PQC1'
+COLUMNAR_SUFFIX = '.pqc'
+CSV_SUFFIX = '.csv'
+BLOCK_ROWS = 65536
+
+INT = 'int'
+STR = 'str'
+
+_U32 = struct.Struct('<I')
+
+def _le_bytes(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_le_bytes(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def _new_column(kind):
+    return array('q') if kind == INT else []
+
+class ColumnarWriter:
+    """Write rows to a ``.pqc`` file one block at a time"""
+    
+    def __init__(self, path, columns, block_rows=BLOCK_ROWS):
+        self.path = path
+        self.columns = list(columns)  # [(name, 'int' | 'str'), ...]
+        self.block_rows = block_rows
+        self.rows_written = 0
+        self._block = [_new_column(kind) for _, kind in self.columns]
+        self._file = open(path, 'wb')
+        header = json.dumps({'columns': self.columns}).encode('utf-8')
+        self._file.write(COLUMNAR_MAGIC + _U32.pack(len(header)) + header)
+    
+    def write_row(self, row):
+        for column, value in zip(self._block, row):
+            column.append(value)
+        self.rows_written += 1
+        if len(self._block[0]) >= self.block_rows:
+            self._flush()
+    
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+    
+    def _flush(self):
+        row_count = len(self._block[0]) if self._block else 0
+        if not row_count:
+            return
+        parts = []
+        for (_, kind), column in zip(self.columns, self._block):
+            if kind == INT:
+                parts.append(_le_bytes(column))
+                continue
+            codes = {}
+            indexes = array('I', [codes.setdefault(value, len(codes)) for value in column])
+            encoded = [value.encode('utf-8') for value in codes]
+            lengths = array('I', [len(value) for value in encoded])
+            parts.append(_U32.pack(len(encoded)) + _le_bytes(lengths) + b''.join(encoded) + _le_bytes(indexes))
+        payload = b''.join(_U32.pack(len(part)) + part for part in parts)
+        compressed = zlib.compress(payload, 1)
+        self._file.write(_U32.pack(row_count) + _U32.pack(len(compressed)) + compressed)
+        self._block = [_new_column(kind) for _, kind in self.columns]
+    
+    def close(self):
+        if self._file is not None:
+            self._flush()
+            self._file.close()
+            self._file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+class ColumnarReader:
+    """Read a ``.pqc`` file block by block"""
+    
+    def __init__(self, path, columns=None):
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            self._file.close()
+            raise ValueError(f"{os.path.basename(path)} is not a columnar export")
+        (header_length,) = _U32.unpack(self._file.read(_U32.size))
+        header = json.loads(self._file.read(header_length).decode('utf-8'))
+        self.file_columns = [tuple(column) for column in header['columns']]
+        # Only the requested columns are decoded
+        self.columns = self.file_columns if columns is None else list(columns)
+        missing = [column[0] for column in self.columns if column not in self.file_columns]
+        if missing:
+            self._file.close()
+            raise ValueError(f"{os.path.basename(path)} is missing columns: {', '.join(missing)}")
+    
+    def iter_blocks(self):
+        """Yield each block as a {column_name: sequence} dict"""
+        while True:
+            head = self._file.read(2 * _U32.size)
+            if len(head) < 2 * _U32.size:
+                return
+            row_count, compressed_length = struct.unpack('<II', head)
+            payload = zlib.decompress(self._file.read(compressed_length))
+            wanted = dict(self.columns)
+            block = {}
+            offset = 0
+            for name, kind in self.file_columns:
+                (part_length,) = _U32.unpack_from(payload, offset)
+                offset += _U32.size
+                if name in wanted:
+                    block[name] = self._decode(kind, payload[offset:offset + part_length], row_count)
+                offset += part_length
+            yield block
+    
+    @staticmethod
+    def _decode(kind, part, row_count):
+        if kind == INT:
+            return _from_le_bytes('q', part)
+        (value_count,) = _U32.unpack_from(part, 0)
+        position = _U32.size
+        lengths = _from_le_bytes('I', part[position:position + 4 * value_count])
+        position += 4 * value_count
+        values = []
+        for length in lengths:
+            values.append(part[position:position + length].decode('utf-8'))
+            position += length
+        indexes = _from_le_bytes('I', part[position:position + 4 * row_count])
+        return [values[index] for index in indexes]
+    
+    def iter_rows(self):
+        names = [name for name, _ in self.columns]
+        for block in self.iter_blocks():
+            yield from zip(*(block[name] for name in names))
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+class CsvWriter:
+    """Write rows to a CSV file with a header line"""
+    
+    def __init__(self, path, columns, append=False):
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        write_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow([name for name, _ in self.columns])
+    
+    def write_row(self, row):
+        self._writer.writerow(row)
+        self.rows_written += 1
+    
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+class CsvReader:
+    """Read a CSV file in column blocks, converting values to the given schema"""
+    
+    def __init__(self, path, columns, block_rows=BLOCK_ROWS):
+        self.path = path
+        self.block_rows = block_rows
+        self._file = open(path, 'r', encoding='utf-8', newline='')
+        self._reader = csv.reader(self._file)
+        header = next(self._reader, [])
+        kinds = dict(columns)
+        missing = [name for name in kinds if name not in header]
+        if missing:
+            self._file.close()
+            raise ValueError(f"{os.path.basename(path)} is missing columns: {', '.join(missing)}")
+        self.columns = list(columns)
+        self._positions = [header.index(name) for name, _ in self.columns]
+    
+    def iter_blocks(self):
+        block = [_new_column(kind) for _, kind in self.columns]
+        for line_num, record in enumerate(self._reader, start=2):
+            if not record:
+                continue
+            try:
+                for (_, kind), column, position in zip(self.columns, block, self._positions):
+                    value = record[position]
+                    column.append(int(value) if kind == INT else value)
+            except (IndexError, ValueError):
+                raise ValueError(f"{os.path.basename(self.path)} line {line_num}: malformed row")
+            if len(block[0]) >= self.block_rows:
+                yield {name: column for (name, _), column in zip(self.columns, block)}
+                block = [_new_column(kind) for _, kind in self.columns]
+        if block and len(block[0]):
+            yield {name: column for (name, _), column in zip(self.columns, block)}
+    
+    def iter_rows(self):
+        names = [name for name, _ in self.columns]
+        for block in self.iter_blocks():
+            yield from zip(*(block[name] for name in names))
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def open_writer(path, columns):
+    """Open a CSV or columnar writer depending on the file extension"""
+    if path.lower().endswith(COLUMNAR_SUFFIX):
+        return ColumnarWriter(path, columns)
+    return CsvWriter(path, columns)
+
+def open_reader(path, columns):
+    """Open a CSV or columnar reader depending on the file extension"""
+    if path.lower().endswith(COLUMNAR_SUFFIX):
+        return ColumnarReader(path, columns)
+    return CsvReader(path, columns)
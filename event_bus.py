@@ -0,0 +1,110 @@
+"""In-process event bus for sale and restock events"""
+import queue
+import threading
+import time
+from collections import namedtuple
+
+SALE = 'sale'
+RESTOCK = 'restock'
+
+# price is in copper; 0 for restocks of unpriced items
+Event = namedtuple('Event', 'kind timestamp trader slot item_name item_id price')
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 100
+
+def make_event(kind, trader, slot, item_name, item_id, price=0, timestamp=None):
+    return Event(kind, time.time() if timestamp is None else timestamp, trader, slot, item_name, item_id, price)
+
+class Subscription:
+    def __init__(self, sink, name, maxsize, batch_size, on_error):
+        self.sink = sink  # callable taking a list of events
+        self.name = name
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.delivered = 0
+        self.failures = 0
+        self.thread = threading.Thread(target=self._run, name=f"sink-{name}", daemon=True)
+        self.thread.start()
+    
+    def offer(self, event):
+        """Queue an event without blocking, dropping the oldest one if the queue is full"""
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+    
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            batch = [event]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    event = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is None:
+                    stop = True
+                    break
+                batch.append(event)
+            try:
+                self.sink(batch)
+                self.delivered += len(batch)
+            except Exception as e:
+                self.failures += 1
+                if self.on_error:
+                    self.on_error(self.name, e)
+            if stop:
+                return
+    
+    def stop(self):
+        self.offer(None)
+
+class EventBus:
+    def __init__(self, on_error=None):
+        self.on_error = on_error  # called as on_error(sink_name, exception) on a sink failure
+        self._subscriptions = []
+        self._lock = threading.Lock()
+    
+    def subscribe(self, sink, name=None, maxsize=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+        """Attach a sink that will be called with lists of events on its own thread"""
+        subscription = Subscription(sink, name or getattr(sink, '__name__', type(sink).__name__),
+                                    maxsize, batch_size, self.on_error)
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+        subscription.stop()
+    
+    def publish(self, event):
+        for subscription in self._subscriptions:
+            subscription.offer(event)
+    
+    def publish_many(self, events):
+        for subscription in self._subscriptions:
+            for event in events:
+                subscription.offer(event)
+    
+    def close(self, timeout=1.0):
+        """Stop every consumer, giving each a moment to flush what is queued"""
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription.stop()
+        deadline = time.time() + timeout
+        for subscription in subscriptions:
+            subscription.thread.join(max(0, deadline - time.time()))
@@ -0,0 +1,121 @@
+"""Sinks that react to sale and restock events from the event bus"""
+import json
+import socket
+import sys
+
+from event_bus import SALE
+
+def event_to_dict(event):
+    return event._asdict()
+
+class TextLogSink:
+    """Write sales to a text log callback such as the sales log widget"""
+    
+    def __init__(self, write):
+        self.write = write
+    
+    def __call__(self, events):
+        for event in events:
+            if event.kind == SALE:
+                self.write(f"SOLD: {event.item_name} (ID: {event.item_id}) for {event.price / 1000.0:.1f} platinum")
+
+class DebugSink:
+    """Note every event in a debug log callback"""
+    
+    def __init__(self, write):
+        self.write = write
+    
+    def __call__(self, events):
+        for event in events:
+            if event.kind == SALE:
+                self.write(f"Sale logged: {event.item_name} for {event.price / 1000.0:.1f} platinum")
+            else:
+                self.write(f"Restocked {event.slot}: {event.item_name} (ID: {event.item_id})")
+
+class LedgerSink:
+    """Append sales to each trader's CSV sales ledger"""
+    
+    def __init__(self, ledger_path):
+        self.ledger_path = ledger_path  # callable mapping a trader to their ledger path
+    
+    def __call__(self, events):
+        from bulk_export import SALES_COLUMNS
+        from columnar_io import CsvWriter
+        rows_by_trader = {}
+        for event in events:
+            if event.kind == SALE:
+                rows_by_trader.setdefault(event.trader, []).append(
+                    (int(event.timestamp), event.trader, event.item_name, event.item_id, event.price))
+        for trader, rows in rows_by_trader.items():
+            with CsvWriter(self.ledger_path(trader), SALES_COLUMNS, append=True) as writer:
+                writer.write_rows(rows)
+
+class NotificationSink:
+    """Show one desktop notification per batch of sales, where the platform has a notifier"""
+    
+    def __init__(self, title="Trader Sales Monitor"):
+        self.title = title
+    
+    def __call__(self, events):
+        sales = [event for event in events if event.kind == SALE]
+        if not sales:
+            return
+        total = sum(event.price for event in sales) / 1000.0
+        if len(sales) == 1:
+            message = f"Sold {sales[0].item_name} for {total:.1f} pp"
+        else:
+            message = f"Sold {len(sales)} items for {total:.1f} pp"
+        self.notify(message)
+    
+    def notify(self, message):
+        import shutil
+        import subprocess
+        if sys.platform == 'darwin':
+            script = f'display notification {json.dumps(message)} with title {json.dumps(self.title)}'
+            command = ['osascript', '-e', script]
+        elif sys.platform.startswith('win'):
+            script = ('Add-Type -AssemblyName System.Windows.Forms;'
+                      '$n = New-Object System.Windows.Forms.NotifyIcon;'
+                      '$n.Icon = [System.Drawing.SystemIcons]::Information; $n.Visible = $true;'
+                      f'$n.ShowBalloonTip(5000, {json.dumps(self.title)}, {json.dumps(message)}, "Info");'
+                      'Start-Sleep -Seconds 6; $n.Dispose()')
+            command = ['powershell', '-NoProfile', '-WindowStyle', 'Hidden', '-Command', script]
+        elif shutil.which('notify-send'):
+            command = ['notify-send', self.title, message]
+        else:
+            return
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=15)
+
+class WebhookSink:
+    """POST each batch as JSON to a local HTTP endpoint"""
+    
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+    
+    def __call__(self, events):
+        import urllib.request
+        body = json.dumps({'events': [event_to_dict(event) for event in events]}).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class SocketSink:
+    """Send events as JSON lines to a local TCP subscriber, reconnecting as needed"""
+    
+    def __init__(self, host, port, timeout=5):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._sock = None
+    
+    def __call__(self, events):
+        payload = ''.join(json.dumps(event_to_dict(event)) + '\n' for event in events).encode('utf-8')
+        try:
+            if self._sock is None:
+                self._sock = socket.create_connection(self.address, timeout=self.timeout)
+            self._sock.sendall(payload)
+        except OSError:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+            raise
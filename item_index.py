@@ -0,0 +1,67 @@
+"""N-gram index for filtering the items view as you type"""
+from collections import defaultdict
+
+class NgramIndex:
+    def __init__(self, gram_size=3):
+        self.gram_size = gram_size
+        self.texts = {}  # key -> indexed text
+        self.postings = defaultdict(set)  # gram -> keys whose text contains it
+    
+    def _grams(self, text):
+        grams = set()
+        for size in range(1, self.gram_size + 1):
+            for start in range(len(text) - size + 1):
+                grams.add(text[start:start + size])
+        return grams
+    
+    def add(self, key, text):
+        """Index one row, replacing any text it had before"""
+        text = text.lower()
+        if self.texts.get(key) == text:
+            return
+        self.remove(key)
+        self.texts[key] = text
+        for gram in self._grams(text):
+            self.postings[gram].add(key)
+    
+    def remove(self, key):
+        text = self.texts.pop(key, None)
+        if text is None:
+            return
+        for gram in self._grams(text):
+            keys = self.postings[gram]
+            keys.discard(key)
+            if not keys:
+                del self.postings[gram]
+    
+    def update(self, entries):
+        """Bring the index in line with a {key: text} snapshot, touching only changed rows"""
+        for key in [key for key in self.texts if key not in entries]:
+            self.remove(key)
+        for key, text in entries.items():
+            self.add(key, text)
+    
+    def search(self, query):
+        """Return the keys whose text contains the query (case-insensitive)"""
+        query = query.strip().lower()
+        if not query:
+            return set(self.texts)
+        if len(query) <= self.gram_size:
+            return set(self.postings.get(query, ()))
+        size = self.gram_size
+        postings = []
+        for start in range(len(query) - size + 1):
+            keys = self.postings.get(query[start:start + size])
+            if not keys:
+                return set()
+            postings.append(keys)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            candidates &= keys
+            if not candidates:
+                return candidates
+        return {key for key in candidates if query in self.texts[key]}
+    
+    def __len__(self):
+        return len(self.texts)
@@ -0,0 +1,99 @@
+"""How long each trader listing has gone unsold, and markdowns for the stale ones"""
+import os
+from bisect import bisect_left
+
+from pq_files import parse_bzr_items
+from sorted_view import SortedView
+from warm_cache import load_cache, save_cache
+
+DEFAULT_STALE_DAYS = 7
+DEFAULT_MARKDOWN_PCT = 10.0
+
+class ListingAges:
+    def __init__(self):
+        self.listings = {}  # slot -> (item_name, item_id, first seen timestamp)
+        self.by_age = SortedView(lambda slot, listing: listing[2])
+    
+    @classmethod
+    def load(cls, path):
+        """Read a saved index; a missing or unreadable file gives an empty one"""
+        ages = cls()
+        state = load_cache(path, 'listing_ages')
+        if state:
+            for slot, (item_name, item_id, first_seen) in state['listings'].items():
+                ages._set(slot, (item_name, item_id, first_seen))
+        return ages
+    
+    def save(self, path):
+        save_cache(path, 'listing_ages', {'listings': self.listings})
+    
+    def _set(self, slot, listing):
+        self.listings[slot] = listing
+        self.by_age.upsert(slot, listing)
+    
+    def _drop(self, slot):
+        if self.listings.pop(slot, None) is not None:
+            self.by_age.remove(slot)
+    
+    def listed(self, slot, item_name, item_id, now):
+        """First-seen time of the slot's listing, starting a new listing if the item changed"""
+        listing = self.listings.get(slot)
+        if listing is None or listing[:2] != (item_name, item_id):
+            listing = (item_name, item_id, now)
+            self._set(slot, listing)
+        return listing[2]
+    
+    def apply(self, sold, restocked, now):
+        """Update from detect_changes' sold [(slot, name, id)] and restocked [(slot, (name, id))]"""
+        for slot, _, _ in sold:
+            self._drop(slot)
+        for slot, (item_name, item_id) in restocked:
+            self._set(slot, (item_name, item_id, now))
+    
+    def reconcile(self, inventory, now):
+        """Match the index to a whole inventory, keeping the ages of unchanged listings"""
+        for slot in [slot for slot in self.listings if slot not in inventory]:
+            self._drop(slot)
+        for slot, (item_name, item_id) in inventory.items():
+            self.listed(slot, item_name, item_id, now)
+    
+    def stale(self, cutoff):
+        """Listings first seen before cutoff as (slot, item_name, item_id, first seen), oldest first"""
+        end = bisect_left(self.by_age.entries, (cutoff,))
+        return [(slot,) + self.listings[slot] for _, slot in self.by_age.entries[:end]]
+    
+    def __len__(self):
+        return len(self.listings)
+
+def propose_markdowns(stale_listings, prices, markdown_pct=DEFAULT_MARKDOWN_PCT):
+    """Return {item: (current, proposed, first seen)} in copper, one per item dated by its oldest stale listing"""
+    proposals = {}
+    for _, item_name, _, first_seen in stale_listings:
+        current = prices.get(item_name, 0)
+        if current <= 1:
+            continue
+        if item_name in proposals:
+            continue  # stale listings come oldest first
+        proposed = max(1, min(current - 1, int(current * (100 - markdown_pct) / 100)))
+        proposals[item_name] = (current, proposed, first_seen)
+    return proposals
+
+def apply_markdowns(book, trader, proposals, write_file=None):
+    """Put the proposals in the price book and patch them into the files listing them; returns the book's changes"""
+    # Items whose price in the trader's file changed since the proposal was made are left alone
+    items = parse_bzr_items(book.mule_file(trader))
+    prices = {item_name: proposed for item_name, (current, proposed, _) in proposals.items()
+              if items.get(item_name) == current}
+    if not prices:
+        return {}
+    if trader not in book.mules:
+        book.add_mule(trader)
+    book.include_items(trader, prices)
+    applied = book.update_prices(prices)
+    
+    for mule in book.mules:
+        listed = [item for item in applied if book.mule_includes(mule, item)]
+        if listed and (mule == trader or os.path.exists(book.mule_file(mule))):
+            current = {mule: items if mule == trader else parse_bzr_items(book.mule_file(mule))}
+            book.regenerate(mules=[mule], current=current, write_file=write_file, items=listed)
+    return applied
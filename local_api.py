@@ -0,0 +1,131 @@
+"""Optional local JSON/HTTP API over the monitor's state"""
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PORT = 8765
+MAX_WAIT = 60
+RECENT_SALES = 200
+
+SECTIONS = ('prices', 'inventory', 'sales', 'status')
+
+class Snapshot:
+    """One published state: the JSON bodies and ETags of every endpoint"""
+    
+    def __init__(self, version, state):
+        self.version = version
+        self.bodies = {}
+        self.etags = {}
+        for section in SECTIONS:
+            self._encode(section, state[section])
+        self._encode('state', state)
+    
+    def _encode(self, name, value):
+        body = json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.bodies[name] = body
+        # Tag per endpoint so an unchanged section stays cacheable while others change
+        self.etags[name] = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+class StateStore:
+    """Holds the current snapshot; publishers replace it, readers wait on it"""
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._snapshot = Snapshot(0, {section: {} for section in SECTIONS})
+        self.recent_sales = deque(maxlen=RECENT_SALES)
+    
+    @property
+    def snapshot(self):
+        return self._snapshot
+    
+    def record_sales(self, sales):
+        """Remember recent sales (dicts) for the /sales endpoint; they show up on the next publish"""
+        with self._condition:
+            self.recent_sales.extend(sales)
+    
+    def publish(self, read_state):
+        """Build a new snapshot from read_state() -> (prices, inventory, status)"""
+        # The state is read under the lock, so whichever thread publishes last publishes the newest state
+        with self._condition:
+            prices, inventory, status = read_state()
+            state = {
+                'prices': dict(prices),
+                'inventory': {slot: {'item': item_name, 'item_id': item_id} for slot, (item_name, item_id) in dict(inventory).items()},
+                'sales': list(self.recent_sales),
+                'status': dict(status),
+            }
+            snapshot = Snapshot(self._snapshot.version + 1, state)
+            unchanged = all(snapshot.etags[name] == self._snapshot.etags[name] for name in SECTIONS)
+            if unchanged:
+                return
+            self._snapshot = snapshot
+            self._condition.notify_all()
+    
+    def wait_for_change(self, name, etag, timeout):
+        """Block until the endpoint's ETag differs from etag or the timeout passes"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._snapshot.etags[name] == etag:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self._snapshot
+
+class _Handler(BaseHTTPRequestHandler):
+    store = None  # set on the per-server subclass
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        name = url.path.strip('/') or 'state'
+        if name not in self.store.snapshot.bodies:
+            self.send_error(404, "Unknown endpoint")
+            return
+        etag = self.headers.get('If-None-Match')
+        snapshot = self.store.snapshot
+        try:
+            wait = min(float(parse_qs(url.query).get('wait', ['0'])[0]), MAX_WAIT)
+        except ValueError:
+            wait = 0
+        if wait > 0 and etag == snapshot.etags[name]:
+            snapshot = self.store.wait_for_change(name, etag, wait)
+        if etag == snapshot.etags[name]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        body = snapshot.bodies[name]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', snapshot.etags[name])
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass  # keep the console quiet
+
+class LocalApiServer:
+    def __init__(self, store, port=DEFAULT_PORT, host='127.0.0.1'):
+        self.store = store
+        handler = type('StateHandler', (_Handler,), {'store': store})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="local-api", daemon=True)
+    
+    @property
+    def address(self):
+        return self.httpd.server_address
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
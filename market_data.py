@@ -0,0 +1,110 @@
+"""Local market observations and undercut recommendations"""
+from collections import deque
+
+from columnar_io import COLUMNAR_SUFFIX, CSV_SUFFIX, INT, STR, open_reader
+
+MARKET_COLUMNS = [('timestamp', INT), ('trader', STR), ('item', STR), ('item_id', STR), ('price', INT)]
+
+MAX_SAMPLES = 64  # most recent observations kept per item
+DEFAULT_HALF_LIFE = 3 * 24 * 3600  # three days
+DEFAULT_QUANTILE = 0.25  # undercut the cheap end of the market, not its outliers
+DEFAULT_UNDERCUT_PCT = 1.0
+DEFAULT_FLOOR_RATIO = 0.5  # never recommend less than half of our reference price
+
+class MarketIndex:
+    def __init__(self, max_samples=MAX_SAMPLES, ignore_traders=()):
+        self.max_samples = max_samples
+        self.ignore_traders = {trader.lower() for trader in ignore_traders}
+        self.samples = {}  # item_name -> deque of (timestamp, price)
+        self.names_by_id = {}  # item_id -> item_name
+        self.latest = 0  # newest timestamp seen
+        self.observations = 0
+    
+    def add(self, timestamp, trader, item_name, item_id, price):
+        """Record one observed listing"""
+        if price <= 0 or trader.lower() in self.ignore_traders:
+            return
+        # Listings of one item ID are pooled under the first name seen for it
+        if item_id and item_id != '0':
+            item_name = self.names_by_id.setdefault(item_id, item_name) if item_name else self.names_by_id.get(item_id)
+        if not item_name:
+            return
+        samples = self.samples.get(item_name)
+        if samples is None:
+            samples = self.samples[item_name] = deque(maxlen=self.max_samples)
+        elif len(samples) == samples.maxlen and timestamp < samples[0][0]:
+            return  # older than everything we keep
+        samples.append((timestamp, price))
+        if timestamp > self.latest:
+            self.latest = timestamp
+        self.observations += 1
+    
+    def ingest_file(self, path):
+        """Stream a market dump into the index; returns the number of lines read"""
+        before = self.observations
+        if path.lower().endswith((CSV_SUFFIX, COLUMNAR_SUFFIX)):
+            with open_reader(path, MARKET_COLUMNS) as reader:
+                for block in reader.iter_blocks():
+                    for row in zip(block['timestamp'], block['trader'], block['item'], block['item_id'], block['price']):
+                        self.add(*row)
+        else:
+            add = self.add
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) < 5:
+                        continue
+                    try:
+                        add(int(parts[0]), parts[1], parts[2], parts[3], int(parts[4]))
+                    except ValueError:
+                        continue
+        return self.observations - before
+    
+    def resolve(self, item):
+        """Return the name the index keeps an item under, given its name or item ID"""
+        if item in self.samples:
+            return item
+        return self.names_by_id.get(item, item)
+    
+    def market_price(self, item, now=None, half_life=DEFAULT_HALF_LIFE, quantile=DEFAULT_QUANTILE):
+        """Time-decayed weighted quantile of an item's observed prices, or None; item is a name or item ID"""
+        samples = self.samples.get(self.resolve(item))
+        if not samples:
+            return None
+        now = self.latest if now is None else now
+        weighted = sorted((price, 0.5 ** (max(0, now - timestamp) / half_life)) for timestamp, price in samples)
+        target = quantile * sum(weight for _, weight in weighted)
+        running = 0.0
+        for price, weight in weighted:
+            running += weight
+            if running >= target:
+                return price
+        return weighted[-1][0]
+    
+    def __len__(self):
+        return len(self.samples)
+
+def load_market_index(paths, ignore_traders=()):
+    """Build an index from several market dumps"""
+    index = MarketIndex(ignore_traders=ignore_traders)
+    for path in paths:
+        index.ingest_file(path)
+    return index
+
+def recommend_undercuts(index, prices, undercut_pct=DEFAULT_UNDERCUT_PCT, floor_ratio=DEFAULT_FLOOR_RATIO,
+                        now=None, half_life=DEFAULT_HALF_LIFE, floors=None):
+    """Return {item: (current, market, recommended)}; never below floor_ratio of floors[item], else of the current price"""
+    recommendations = {}
+    for item, price in prices.items():
+        if price <= 0:
+            continue
+        market = index.market_price(item, now=now, half_life=half_life)
+        if market is None:
+            continue
+        target = int(market * (100 - undercut_pct) / 100)
+        # The floor comes from a reference that undercuts do not move, so repeated Applies cannot walk a price down
+        reference = (floors or {}).get(item) or price
+        target = max(target, int(reference * floor_ratio), 1)
+        if target < price:
+            recommendations[item] = (price, market, target)
+    return recommendations
@@ -0,0 +1,341 @@
+"""Headless sale monitor that monitor windows attach to"""
+import argparse
+import configparser
+import json
+import logging
+import logging.handlers
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+from event_bus import SALE, Event, EventBus, make_event
+from event_sinks import LedgerSink, NotificationSink, SocketSink, WebhookSink, event_to_dict
+from listing_ages import ListingAges
+from local_api import StateStore
+from pq_files import bzr_filename, inventory_filename, listings_filename, sales_ledger_filename
+from sale_detector import POLL_INTERVAL, SaleMonitor, watch_inventory
+from warm_cache import load_cache, save_cache
+
+CONFIG_FILE = "trader_monitor_config.ini"
+CACHE_FILE = "monitor_daemon_cache.json"
+DEFAULT_DAEMON_PORT = 8766
+CLIENT_QUEUE_SIZE = 1000
+CONNECT_TIMEOUT = 5
+
+# Marker published on the bus after every change; client connections answer it with a snapshot
+SNAPSHOT = 'snapshot'
+
+log = logging.getLogger("monitor_daemon")
+
+# Loopback protocol, one UTF-8 JSON message per line: the daemon sends {"type": "snapshot", "state": ...} on
+# connect and {"type": "events", "events": [...]} as sales and restocks happen, each batch followed by a fresh
+# snapshot; a client may send {"op": "snapshot"} or {"op": "check"}
+def encode_message(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode('utf-8')
+
+def read_daemon_config(config_file=CONFIG_FILE):
+    """Return the settings the daemon shares with the monitor window"""
+    settings = {'character_name': '', 'root_directory': '', 'port': DEFAULT_DAEMON_PORT,
+                'api_enabled': False, 'api_port': 8765,
+                'notifications': False, 'webhook_url': '', 'socket_address': ''}
+    if not os.path.exists(config_file):
+        return settings
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    if 'Settings' in config:
+        settings['character_name'] = config['Settings'].get('character_name', '')
+        settings['root_directory'] = config['Settings'].get('root_directory', '')
+    if 'Daemon' in config:
+        settings['port'] = config['Daemon'].getint('port', DEFAULT_DAEMON_PORT)
+    if 'Api' in config:
+        settings['api_enabled'] = config['Api'].getboolean('enabled', False)
+        settings['api_port'] = config['Api'].getint('port', 8765)
+    if 'Sinks' in config:
+        settings['notifications'] = config['Sinks'].getboolean('notifications', False)
+        settings['webhook_url'] = config['Sinks'].get('webhook_url', '')
+        settings['socket_address'] = config['Sinks'].get('socket_address', '')
+    return settings
+
+class _ClientHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.send_lock = threading.Lock()
+    
+    def send(self, payload):
+        with self.send_lock:
+            self.wfile.write(payload)
+    
+    def send_snapshot(self):
+        body = self.server.monitor.store.snapshot.bodies['state']
+        self.send(b'{"type":"snapshot","state":' + body + b'}\n')
+    
+    def deliver(self, events):
+        """Bus sink: runs on this client's consumer thread"""
+        changes = [event_to_dict(event) for event in events if event.kind != SNAPSHOT]
+        if changes:
+            self.send(encode_message({'type': 'events', 'events': changes}))
+        # However many changes a lagging client missed, it needs only the latest state
+        if len(changes) < len(events):
+            self.send_snapshot()
+    
+    def handle(self):
+        monitor = self.server.monitor
+        name = f"client {self.client_address[0]}:{self.client_address[1]}"
+        log.info("%s attached", name)
+        # Subscribe first: a change published in between is sent twice rather than lost
+        subscription = monitor.client_bus.subscribe(self.deliver, name=name, maxsize=CLIENT_QUEUE_SIZE)
+        self.send_snapshot()
+        try:
+            for line in self.rfile:
+                try:
+                    op = json.loads(line).get('op')
+                except (ValueError, AttributeError):
+                    continue
+                if op == 'snapshot':
+                    self.send_snapshot()
+                elif op == 'check':
+                    monitor.check_for_sales()
+        except OSError:
+            pass
+        finally:
+            monitor.client_bus.unsubscribe(subscription)
+            log.info("%s detached", name)
+
+class _ClientServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class MonitorDaemon:
+    def __init__(self, character_name, root_directory, port=DEFAULT_DAEMON_PORT, interval=POLL_INTERVAL,
+                 cache_file=CACHE_FILE, sink_settings=None, api_port=None):
+        self.character_name = character_name
+        self.root_directory = root_directory
+        self.bzr_file = os.path.join(root_directory, bzr_filename(character_name))
+        self.inventory_file = os.path.join(root_directory, inventory_filename(character_name))
+        self.listings_file = os.path.join(root_directory, listings_filename(character_name))
+        self.port = port
+        self.interval = interval
+        self.cache_file = cache_file
+        self.api_port = api_port
+        self.sale_monitor = SaleMonitor(character_name, self.inventory_file, self.bzr_file, log=log.debug)
+        self.started = time.time()
+        self.running = False
+        self.check_lock = threading.Lock()
+        self.server = None
+        self.api_server = None
+        
+        self.store = StateStore()
+        self.event_bus = EventBus(on_error=self.on_sink_error)
+        # Attached windows get their own bus, which also carries the snapshot markers
+        self.client_bus = EventBus(on_error=self.on_sink_error)
+        self.event_bus.subscribe(LedgerSink(lambda trader: os.path.join(self.root_directory, sales_ledger_filename(trader))), name="ledger")
+        self.event_bus.subscribe(self.record_sales, name="state")
+        sink_settings = sink_settings or {}
+        if sink_settings.get('notifications'):
+            self.event_bus.subscribe(NotificationSink(), name="notifications", maxsize=100)
+        if sink_settings.get('webhook_url'):
+            self.event_bus.subscribe(WebhookSink(sink_settings['webhook_url']), name="webhook")
+        if sink_settings.get('socket_address'):
+            host, _, socket_port = sink_settings['socket_address'].rpartition(':')
+            try:
+                self.event_bus.subscribe(SocketSink(host or '127.0.0.1', int(socket_port)), name="socket")
+            except ValueError:
+                log.warning("Invalid socket_address: %s", sink_settings['socket_address'])
+    
+    def load(self):
+        """Read the prices and restore the last inventory seen, even from before a restart"""
+        sales = self.sale_monitor
+        state = load_cache(self.cache_file, 'monitor_daemon')
+        if state and state.get('character_name') == self.character_name and state.get('root_directory') == self.root_directory:
+            # The prices are read again, since the BZR file may have changed while the daemon was stopped
+            sales.restore(state)
+            sales.reload_prices()
+            log.info("Restored %d items from the last run", len(sales.last_inventory))
+        else:
+            sales.load()
+        with sales.lock:
+            sales.listing_ages = ListingAges.load(self.listings_file)
+            sales.listing_ages.reconcile(sales.last_inventory, time.time())
+        log.info("Loaded %d prices, %d items in satchels", len(sales.item_prices), len(sales.last_inventory))
+        self.publish_state()
+    
+    def save_state(self):
+        try:
+            save_cache(self.cache_file, 'monitor_daemon', {
+                'character_name': self.character_name,
+                'root_directory': self.root_directory,
+                **self.sale_monitor.cache_state(),
+            })
+            with self.sale_monitor.lock:
+                self.sale_monitor.listing_ages.save(self.listings_file)
+        except Exception as e:
+            log.warning("Error saving state: %s", e)
+    
+    def check_for_sales(self):
+        """Diff the current dump against the last one and publish what changed"""
+        with self.check_lock:
+            try:
+                events, sold, restocked, prices_changed = self.sale_monitor.check()
+                if prices_changed:
+                    log.info("BZR file changed, reloaded %d prices", len(self.sale_monitor.item_prices))
+                for event in events:
+                    if event.kind == SALE:
+                        log.info("SOLD: %s (ID: %s) for %.1f platinum", event.item_name, event.item_id, event.price / 1000.0)
+                
+                if sold or restocked:
+                    self.save_state()
+                if events:
+                    self.event_bus.publish_many(events)
+                if sold or restocked or prices_changed:
+                    self.publish_state()
+                    self.client_bus.publish_many(events + [make_event(SNAPSHOT, self.character_name, '', '', '')])
+            except Exception as e:
+                log.warning("Error checking for sales: %s", e)
+    
+    def record_sales(self, events):
+        """Bus sink keeping the snapshot's recent sales current"""
+        sales = [event_to_dict(event) for event in events if event.kind == SALE]
+        if sales:
+            self.store.record_sales(sales)
+            self.publish_state()
+    
+    def on_sink_error(self, name, error):
+        log.warning("Sink '%s' failed: %s", name, error)
+    
+    def publish_state(self):
+        self.store.publish(self.state)
+    
+    def state(self):
+        sales = self.sale_monitor
+        return sales.item_prices, sales.last_inventory, {
+            'character_name': self.character_name,
+            'monitoring': self.running,
+            'daemon': True,
+            'items_priced': len(sales.item_prices),
+            'items_in_satchels': len(sales.last_inventory),
+            'last_change': sales.last_change_time,
+            'started': self.started,
+            'bzr_file': self.bzr_file,
+            'inventory_file': self.inventory_file,
+        }
+    
+    def start_servers(self):
+        self.server = _ClientServer(('127.0.0.1', self.port), _ClientHandler)
+        self.server.monitor = self
+        threading.Thread(target=self.server.serve_forever, name="daemon-clients", daemon=True).start()
+        log.info("Accepting monitor windows on 127.0.0.1:%d", self.server.server_address[1])
+        if self.api_port:
+            from local_api import LocalApiServer
+            try:
+                self.api_server = LocalApiServer(self.store, port=self.api_port).start()
+                log.info("Local API listening on http://127.0.0.1:%d/", self.api_port)
+            except OSError as e:
+                log.warning("Could not start local API on port %d: %s", self.api_port, e)
+    
+    def run(self):
+        """Monitor until stop() is called"""
+        self.running = True
+        self.load()
+        self.start_servers()
+        # Catch up on anything that sold while the daemon was not running
+        self.check_for_sales()
+        while self.running:
+            watch_inventory(self.inventory_file, lambda: self.running, self.check_for_sales, self.interval, log=log.debug)
+            if self.running:
+                # watch_inventory gives up on an unexpected error; a daemon carries on
+                log.warning("Monitoring loop stopped, restarting")
+                time.sleep(self.interval)
+        self.shutdown()
+    
+    def stop(self):
+        self.running = False
+    
+    def shutdown(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.api_server is not None:
+            self.api_server.stop()
+        self.client_bus.close()
+        self.event_bus.close()
+        self.save_state()
+        log.info("Stopped")
+
+class DaemonClient:
+    """Connection from a monitor window; callbacks run on the client's reader thread"""
+    
+    def __init__(self, on_snapshot, on_events, on_close, port=DEFAULT_DAEMON_PORT, host='127.0.0.1'):
+        self.on_snapshot = on_snapshot  # called with the state dict
+        self.on_events = on_events  # called with a list of Events
+        self.on_close = on_close  # called with the error, or None after close()
+        self.address = (host, port)
+        self.sock = None
+        self.closing = False
+    
+    def connect(self):
+        self.sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+        self.sock.settimeout(None)
+        threading.Thread(target=self._run, name="daemon-client", daemon=True).start()
+        return self
+    
+    def _run(self):
+        error = None
+        try:
+            with self.sock.makefile('r', encoding='utf-8') as messages:
+                for line in messages:
+                    message = json.loads(line)
+                    if message.get('type') == 'snapshot':
+                        self.on_snapshot(message['state'])
+                    elif message.get('type') == 'events':
+                        self.on_events([Event(**event) for event in message['events']])
+            error = ConnectionError("daemon closed the connection")
+        except (OSError, ValueError) as e:
+            error = e
+        finally:
+            self.on_close(None if self.closing else error)
+    
+    def request(self, op):
+        self.sock.sendall(encode_message({'op': op}))
+    
+    def close(self):
+        self.closing = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+def main():
+    settings = read_daemon_config()
+    parser = argparse.ArgumentParser(description="Headless trader sales monitor")
+    parser.add_argument('--character', default=settings['character_name'])
+    parser.add_argument('--root', default=settings['root_directory'], help="folder holding the dump and BZR file")
+    parser.add_argument('--port', type=int, default=settings['port'], help="loopback port monitor windows attach to")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help="seconds between checks of the dump")
+    parser.add_argument('--log', help="log to this file (rotated) instead of the console")
+    parser.add_argument('--verbose', action='store_true', help="also log every check")
+    args = parser.parse_args()
+    
+    if not args.character or not args.root:
+        parser.error("no character or root directory; pass --character and --root or save them in the monitor window")
+    
+    if args.log:
+        handler = logging.handlers.RotatingFileHandler(args.log, maxBytes=1024 * 1024, backupCount=3, encoding='utf-8')
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+    log.addHandler(handler)
+    log.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+    
+    monitor = MonitorDaemon(args.character, args.root, port=args.port, interval=args.interval, sink_settings=settings,
+                            api_port=settings['api_port'] if settings['api_enabled'] else None)
+    signal.signal(signal.SIGINT, lambda signum, frame: monitor.stop())
+    signal.signal(signal.SIGTERM, lambda signum, frame: monitor.stop())
+    log.info("Monitoring %s in %s", args.character, args.root)
+    monitor.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Readers and writers for the BZR files shared by the helper apps"""
+import os
+import re
+
+BZR_PATTERN = "BZR_*_pq.proj.ini"
+BZR_PREFIX = "BZR_"
+BZR_SUFFIX = "_pq.proj.ini"
+INVENTORY_SUFFIX = "-Inventory.txt"
+INVENTORY_PATTERN = "*" + INVENTORY_SUFFIX
+SALES_LEDGER_SUFFIX = "-Sales.csv"
+SALES_LEDGER_PATTERN = "*" + SALES_LEDGER_SUFFIX
+LISTINGS_SUFFIX = "-Listings.json"
+
+TRADER_SLOT_RE = re.compile(r'General\d+-Slot\d+')
+
+def bzr_filename(trader_name):
+    """Return the BZR file name used for a trader"""
+    return f"{BZR_PREFIX}{trader_name}{BZR_SUFFIX}"
+
+def trader_from_bzr_path(file_path):
+    """Return the trader name encoded in a BZR file path"""
+    filename = os.path.basename(file_path)
+    return filename[len(BZR_PREFIX):len(filename) - len(BZR_SUFFIX)]
+
+def inventory_filename(trader_name):
+    """Return the /output inventory file name used for a trader"""
+    return f"{trader_name}{INVENTORY_SUFFIX}"
+
+def sales_ledger_filename(trader_name):
+    """Return the sales ledger file name used for a trader"""
+    return f"{trader_name}{SALES_LEDGER_SUFFIX}"
+
+def listings_filename(trader_name):
+    """Return the listing age index file name used for a trader"""
+    return f"{trader_name}{LISTINGS_SUFFIX}"
+
+def trader_from_path(file_path, suffix):
+    """Return the trader name in front of a per-trader file suffix"""
+    filename = os.path.basename(file_path)
+    return filename[:len(filename) - len(suffix)]
+
+def iter_inventory_items(file_path):
+    """Yield (slot, item_name, item_id) for every item in the trader satchels"""
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.strip()
+            if line and '\t' in line:
+                parts = line.split('\t')
+                if len(parts) >= 3:
+                    slot, item_name, item_id = parts[0], parts[1], parts[2]
+                    # Track items in any General*-Slot* format (all trader satchel items)
+                    if TRADER_SLOT_RE.match(slot) and item_name != 'Empty':
+                        yield slot, item_name, item_id
+
+def count_satchel_slots(file_path):
+    """Count the trader satchel slots in an inventory dump, empty ones included"""
+    slots = 0
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if TRADER_SLOT_RE.match(line):
+                slots += 1
+    return slots
+
+def parse_bzr_items(file_path):
+    """Parse a BZR file and return the item=price pairs of its [ItemToSell] section"""
+    items = {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    # Find [ItemToSell] section
+    item_section_match = re.search(r'\[ItemToSell\](.*?)(?=\[|$)', content, re.DOTALL)
+    if not item_section_match:
+        return items
+    
+    item_section = item_section_match.group(1)
+    
+    # Parse item=price lines
+    for line in item_section.strip().split('\n'):
+        line = line.strip()
+        if '=' in line and not line.startswith('['):
+            item_name, price_str = line.split('=', 1)
+            try:
+                price = int(price_str)
+                items[item_name.strip()] = price
+            except ValueError:
+                continue
+    
+    return items
+
+def write_bzr_items(file_path, items):
+    """Replace the [ItemToSell] section of a BZR file, keeping every other section"""
+    content = ""
+    if os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    
+    new_section = '[ItemToSell]\n'
+    for item, price in sorted(items.items()):
+        new_section += f'{item}={price}\n'
+    
+    # Find [ItemToSell] section
+    item_section_match = re.search(r'(\[ItemToSell\])(.*?)(?=(\[|$))', content, re.DOTALL)
+    if not item_section_match:
+        # If no [ItemToSell] section exists, create one at the end
+        if content and not content.endswith('\n'):
+            content += '\n'
+        content += new_section
+    else:
+        # Replace the existing section
+        before_section = content[:item_section_match.start()]
+        after_section = content[item_section_match.end():]
+        content = before_section + new_section + after_section
+    
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(content)
@@ -0,0 +1,209 @@
+"""Canonical price book that the BZR files are generated from"""
+import glob
+import hashlib
+import json
+import os
+import re
+from fnmatch import translate
+
+from pq_files import bzr_filename, parse_bzr_items, write_bzr_items
+
+PRICE_BOOK_FILENAME = "pq_price_book.json"
+PRICE_BOOK_VERSION = 1
+
+class PriceBook:
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, PRICE_BOOK_FILENAME)
+        self.prices = {}  # item_name -> copper price
+        self.mules = {}  # mule -> {'include': [patterns], 'exclude': [patterns]}
+        self.projection_digests = {}  # mule -> digest of the last written projection
+        self._matchers = {}  # mule -> compiled rule, rebuilt when the rule changes
+    
+    @classmethod
+    def load(cls, folder):
+        """Load the price book stored in a folder, or return an empty one"""
+        book = cls(folder)
+        if os.path.exists(book.path):
+            with open(book.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            book.prices = {item: int(price) for item, price in data.get('prices', {}).items()}
+            book.mules = data.get('mules', {})
+            book.projection_digests = data.get('projection_digests', {})
+        return book
+    
+    def save(self):
+        """Write the price book to disk"""
+        data = {
+            'version': PRICE_BOOK_VERSION,
+            'prices': dict(sorted(self.prices.items())),
+            'mules': self.mules,
+            'projection_digests': self.projection_digests,
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp_path, self.path)
+    
+    def add_mule(self, mule, include=None, exclude=None):
+        """Register a mule; by default it lists every item in the book"""
+        self.mules[mule] = {
+            'include': list(include) if include is not None else ['*'],
+            'exclude': list(exclude or []),
+        }
+        self._matchers.pop(mule, None)
+    
+    def include_items(self, mule, items):
+        """Make a mule's rule select the items, keeping the rest of the rule"""
+        rule = self.mules[mule]
+        patterns = {literal_pattern(item) for item in items}
+        rule['exclude'] = [pattern for pattern in rule['exclude'] if pattern not in patterns]
+        self._matchers.pop(mule, None)
+        missing = sorted(literal_pattern(item) for item in items if not self.mule_includes(mule, item))
+        if missing:
+            rule['include'].extend(missing)
+            self._matchers.pop(mule, None)
+    
+    def forget_items(self, mule, items):
+        """Drop the literal includes naming the items from a mule's rule"""
+        rule = self.mules[mule]
+        patterns = {literal_pattern(item) for item in items}
+        rule['include'] = [pattern for pattern in rule['include'] if pattern not in patterns]
+        self._matchers.pop(mule, None)
+    
+    def exclude_items(self, mule, items):
+        """Make a mule's rule leave the items out, keeping the rest of the rule"""
+        rule = self.mules[mule]
+        patterns = {literal_pattern(item) for item in items} - set(rule['exclude'])
+        rule['exclude'].extend(sorted(patterns))
+        self._matchers.pop(mule, None)
+    
+    def _matcher(self, mule):
+        matcher = self._matchers.get(mule)
+        if matcher is None:
+            rule = self.mules[mule]
+            named = set(rule['include'])  # literal includes; unpriced items are only listed where named
+            matcher = (_compile_patterns(rule['include']), _compile_patterns(rule['exclude']), named)
+            self._matchers[mule] = matcher
+        return matcher
+    
+    def mule_includes(self, mule, item):
+        """Return True if the mule's rule selects the item; a 0 price item only where the rule names it"""
+        if mule not in self.mules:
+            return False
+        include, exclude, named = self._matcher(mule)
+        if self.prices.get(item) == 0:
+            return literal_pattern(item) in named and not exclude(item)
+        return include(item) and not exclude(item)
+    
+    def projection(self, mule):
+        """Return the {item: price} listing generated for a mule"""
+        rule = self.mules.get(mule)
+        if rule is None:
+            return {}
+        if rule['include'] == ['*'] and not rule['exclude']:
+            return {item: price for item, price in self.prices.items() if price != 0}
+        return {item: price for item, price in self.prices.items() if self.mule_includes(mule, item)}
+    
+    def mules_listing(self, item):
+        """Return the mules whose projection contains the item"""
+        return [mule for mule in self.mules if self.mule_includes(mule, item)]
+    
+    def set_price(self, item, price):
+        """Set one item's price and return the mules whose files list it"""
+        if self.prices.get(item) == price:
+            return []
+        self.prices[item] = price
+        return self.mules_listing(item)
+    
+    def update_prices(self, prices):
+        """Merge several prices into the book and return the changed items"""
+        changed = {}
+        for item, price in prices.items():
+            if self.prices.get(item) != price:
+                changed[item] = (self.prices.get(item), price)
+                self.prices[item] = price
+        return changed
+    
+    def remove_prices(self, items):
+        """Drop items from the book and return them as {item: (old price, None)}"""
+        return {item: (self.prices.pop(item), None) for item in items if item in self.prices}
+    
+    def mule_file(self, mule):
+        return os.path.join(self.folder, bzr_filename(mule))
+    
+    def regenerate(self, mules=None, current=None, create=False, write_file=None, items=None):
+        """Rewrite the BZR files whose projection changed; returns {mule: (old_items, new_items)} per file written"""
+        # current maps mules to what their files hold now and is compared instead of the stored digest.
+        # With items, only those entries are patched into the files, so other edits made in game are kept;
+        # an entry the mule no longer selects is taken out.
+        write_file = write_file or _write_projection
+        written = {}
+        for mule in (self.mules if mules is None else mules):
+            file_path = self.mule_file(mule)
+            if not create and not os.path.exists(file_path):
+                continue
+            projection = self.projection(mule)
+            digest = projection_digest(projection)
+            old_items = (current or {}).get(mule)
+            if items is not None:
+                if old_items is None:
+                    old_items = parse_bzr_items(file_path) if os.path.exists(file_path) else {}
+                new_items = self._patch(mule, old_items, items)
+                if new_items == old_items:
+                    continue
+            else:
+                new_items = projection
+                if old_items is not None:
+                    if old_items == new_items:
+                        self.projection_digests[mule] = digest
+                        continue
+                elif self.projection_digests.get(mule) == digest and os.path.exists(file_path):
+                    continue
+            if not write_file(file_path, new_items):
+                continue
+            if new_items == projection:
+                self.projection_digests[mule] = digest
+            else:
+                # The file still differs from the book, so the next full regenerate must rewrite it
+                self.projection_digests.pop(mule, None)
+            written[mule] = (old_items, new_items)
+        return written
+    
+    def _patch(self, mule, file_items, items):
+        new_items = dict(file_items)
+        for item in items:
+            if self.mule_includes(mule, item):
+                new_items[item] = self.prices[item]
+            else:
+                new_items.pop(item, None)
+        return new_items
+
+def literal_pattern(item):
+    """Return an include/exclude pattern that matches exactly one item name"""
+    return glob.escape(item)
+
+def _compile_patterns(patterns):
+    # Plain names are looked up in a set; only real wildcards go through a regex
+    literals = set()
+    wildcards = []
+    for pattern in patterns:
+        if any(char in pattern for char in '*?['):
+            wildcards.append(pattern)
+        else:
+            literals.add(pattern)
+    regex = re.compile('|'.join(translate(pattern) for pattern in wildcards)) if wildcards else None
+    if regex is None:
+        return literals.__contains__
+    return lambda item: item in literals or regex.match(item) is not None
+
+def _write_projection(file_path, items):
+    write_bzr_items(file_path, items)
+    return True
+
+def projection_digest(items):
+    """Return a stable digest of an {item: price} listing"""
+    h = hashlib.sha1()
+    for item, price in sorted(items.items()):
+        h.update(f"{item}={price}\n".encode('utf-8'))
+    return h.hexdigest()
@@ -0,0 +1,206 @@
+"""Append-only journal of every price change made to the price book"""
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+
+if sys.platform.startswith('win'):
+    import msvcrt
+else:
+    import fcntl
+
+PRICE_JOURNAL_DIRNAME = "pq_price_journal"
+NAMES_FILENAME = "names.txt"  # item names, the line number being the item number
+LOCK_FILENAME = "journal.lock"
+
+SOURCE_SYNC = 1
+SOURCE_MANUAL = 2
+SOURCE_IMPORT = 3
+SOURCE_AUTO_SYNC = 4
+SOURCE_MARKDOWN = 5
+SOURCE_MARKET = 6
+SOURCE_NAMES = {SOURCE_SYNC: "sync", SOURCE_MANUAL: "manual", SOURCE_IMPORT: "import", SOURCE_AUTO_SYNC: "auto-sync",
+                SOURCE_MARKDOWN: "markdown", SOURCE_MARKET: "market"}
+
+NO_PRICE = -1  # old or new price of an item that had none
+
+# One file per column; column name -> array typecode
+COLUMNS = [('timestamps', 'I'), ('items', 'I'), ('old_prices', 'i'), ('new_prices', 'i'), ('sources', 'B')]
+
+@contextmanager
+def _locked(path):
+    """Hold the journal's lock file, so several apps can share one journal"""
+    with open(os.path.join(path, LOCK_FILENAME), 'a+b') as f:
+        if sys.platform.startswith('win'):
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform.startswith('win'):
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class PriceJournal:
+    def __init__(self, folder):
+        self.path = os.path.join(folder, PRICE_JOURNAL_DIRNAME)
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self.names = []  # item number -> item name
+        self.numbers = {}  # item name -> item number
+        self.by_item = {}  # item number -> array of record numbers
+        self.names_offset = 0  # bytes of names.txt read so far
+    
+    @classmethod
+    def open(cls, folder):
+        """Load the folder's journal, or start an empty one"""
+        journal = cls(folder)
+        journal.refresh()
+        return journal
+    
+    def _column_path(self, name):
+        return os.path.join(self.path, name + '.bin')
+    
+    def refresh(self):
+        """Read whatever other apps appended since the journal was loaded"""
+        if os.path.isdir(self.path):
+            with _locked(self.path):
+                self._read_new()
+    
+    def _read_new(self):
+        # Only called under the lock, so no other writer is part way through an append
+        names_path = os.path.join(self.path, NAMES_FILENAME)
+        if os.path.exists(names_path):
+            with open(names_path, 'rb') as f:
+                f.seek(self.names_offset)
+                data = f.read()
+            data = data[:data.rfind(b'\n') + 1]
+            self.names_offset += len(data)
+            for name in data.decode('utf-8').splitlines():
+                self.numbers[name] = len(self.names)
+                self.names.append(name)
+        
+        start = len(self.columns['items'])
+        for name, column in self.columns.items():
+            column_path = self._column_path(name)
+            if os.path.exists(column_path):
+                with open(column_path, 'rb') as f:
+                    f.seek(len(column) * column.itemsize)
+                    data = f.read()
+                new = array(column.typecode)
+                new.frombytes(data[:len(data) // column.itemsize * column.itemsize])
+                if sys.byteorder == 'big':
+                    new.byteswap()
+                column.extend(new)
+        
+        # An interrupted append can leave some columns one record longer; drop the partial record
+        count = min(len(column) for column in self.columns.values())
+        for name, column in self.columns.items():
+            if len(column) > count:
+                del column[count:]
+                os.truncate(self._column_path(name), count * column.itemsize)
+        
+        items = self.columns['items']
+        for record in range(start, count):
+            positions = self.by_item.get(items[record])
+            if positions is None:
+                positions = self.by_item[items[record]] = array('I')
+            positions.append(record)
+    
+    def record(self, changes, source, timestamp=None):
+        """Append {item: (old price or None, new price)}; returns the number of records written"""
+        if not changes:
+            return 0
+        os.makedirs(self.path, exist_ok=True)
+        with _locked(self.path):
+            # Another app may have appended names and records since we last looked
+            self._read_new()
+            self._append(changes, source, timestamp)
+        return len(changes)
+    
+    def _append(self, changes, source, timestamp):
+        timestamps = self.columns['timestamps']
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        if timestamps:
+            timestamp = max(timestamp, timestamps[-1])  # keep the column sorted for bisect
+        
+        new_names = [item for item in changes if item not in self.numbers]
+        if new_names:
+            # Names go to disk before any record refers to them
+            data = ''.join(item + '\n' for item in new_names).encode('utf-8')
+            with open(os.path.join(self.path, NAMES_FILENAME), 'ab') as f:
+                f.write(data)
+            self.names_offset += len(data)
+            for item in new_names:
+                self.numbers[item] = len(self.names)
+                self.names.append(item)
+        
+        start = len(timestamps)
+        rows = {name: array(typecode) for name, typecode in COLUMNS}
+        for item, (old_price, new_price) in changes.items():
+            number = self.numbers[item]
+            rows['timestamps'].append(timestamp)
+            rows['items'].append(number)
+            rows['old_prices'].append(NO_PRICE if old_price is None else old_price)
+            rows['new_prices'].append(NO_PRICE if new_price is None else new_price)
+            rows['sources'].append(source)
+            positions = self.by_item.get(number)
+            if positions is None:
+                positions = self.by_item[number] = array('I')
+            positions.append(start + len(rows['items']) - 1)
+        
+        for name, column in rows.items():
+            self.columns[name].extend(column)
+            if sys.byteorder == 'big':
+                column.byteswap()
+            with open(self._column_path(name), 'ab') as f:
+                column.tofile(f)
+    
+    def _row(self, record):
+        columns = self.columns
+        old_price = columns['old_prices'][record]
+        new_price = columns['new_prices'][record]
+        return (columns['timestamps'][record], self.names[columns['items'][record]],
+                None if old_price == NO_PRICE else old_price, None if new_price == NO_PRICE else new_price,
+                columns['sources'][record])
+    
+    def history(self, item, start=None, end=None):
+        """Changes to one item as (timestamp, item, old, new, source), oldest first"""
+        number = self.numbers.get(item)
+        if number is None:
+            return []
+        timestamps = self.columns['timestamps']
+        rows = []
+        for record in self.by_item.get(number, ()):
+            timestamp = timestamps[record]
+            if (start is None or timestamp >= start) and (end is None or timestamp < end):
+                rows.append(self._row(record))
+        return rows
+    
+    def changes_between(self, start, end=None):
+        """All changes with start <= timestamp < end, oldest first"""
+        timestamps = self.columns['timestamps']
+        first = bisect_left(timestamps, start)
+        last = len(timestamps) if end is None else bisect_left(timestamps, end, first)
+        return [self._row(record) for record in range(first, last)]
+    
+    def last_change(self, item):
+        """The item's most recent change, or None"""
+        positions = self.by_item.get(self.numbers.get(item))
+        return self._row(positions[-1]) if positions else None
+    
+    def first_price(self, item):
+        """The item's price before its first recorded change, or its first price; None if never recorded"""
+        positions = self.by_item.get(self.numbers.get(item))
+        if not positions:
+            return None
+        _, _, old_price, new_price, _ = self._row(positions[0])
+        return new_price if old_price is None else old_price
+    
+    def __len__(self):
+        return len(self.columns['timestamps'])
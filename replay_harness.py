@@ -0,0 +1,338 @@
+"""Record inventory dumps and BZR files, then replay them against the sale detector"""
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+
+from event_bus import SALE
+from pq_files import bzr_filename, inventory_filename
+from sale_detector import POLL_INTERVAL, SaleMonitor, read_inventory, read_prices, watch_inventory
+from warm_cache import file_fingerprint
+
+INVENTORY = 'inventory'
+BZR = 'bzr'
+SOLD = 'sold'  # generated recordings only: JSON [slot, item_name, item_id] sold since the previous dump
+
+RECORD_INTERVAL = 0.5
+SETTLE_TIMEOUT = 5.0  # seconds the monitor gets to catch up after the last dump
+
+def iter_recording(path):
+    """Yield the header and then every (timestamp, kind, text) of a recording"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            header = json.loads(f.readline())
+            yield header
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield entry['t'], entry['kind'], entry['text']
+        except EOFError:
+            return  # the recorder was killed mid-write; keep what is complete
+
+class RecordingWriter:
+    def __init__(self, path, character, ground_truth=False):
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self.entries = 0
+        self._write({'character': character, 'recorded': time.time(), 'ground_truth': ground_truth})
+    
+    def _write(self, value):
+        self.file.write(json.dumps(value) + '\n')
+        self.file.flush()
+    
+    def add(self, timestamp, kind, text):
+        self._write({'t': timestamp, 'kind': kind, 'text': text})
+        self.entries += 1
+    
+    def close(self):
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def record(root, character, out_path, interval=RECORD_INTERVAL, duration=None, is_running=None):
+    """Append each new version of the character's dump and BZR file until stopped"""
+    paths = {INVENTORY: os.path.join(root, inventory_filename(character)),
+             BZR: os.path.join(root, bzr_filename(character))}
+    fingerprints = dict.fromkeys(paths)
+    deadline = None if duration is None else time.time() + duration
+    with RecordingWriter(out_path, character) as writer:
+        try:
+            while (is_running is None or is_running()) and (deadline is None or time.time() < deadline):
+                # BZR first so a replayed dump is always priced by the BZR state it was made under
+                for kind in (BZR, INVENTORY):
+                    fingerprint = file_fingerprint(paths[kind])
+                    if fingerprint is not None and fingerprint != fingerprints[kind]:
+                        with open(paths[kind], 'r', encoding='utf-8', errors='ignore') as f:
+                            writer.add(time.time(), kind, f.read())
+                        fingerprints[kind] = fingerprint
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        return writer.entries
+
+def _inventory_text(satchels):
+    lines = []
+    for slot, item in sorted(satchels.items()):
+        item_name, item_id = item if item else ('Empty', '0')
+        lines.append(f"{slot}\t{item_name}\t{item_id}\t{0 if item is None else 1}\t1")
+    return '\n'.join(lines) + '\n'
+
+def _bzr_text(prices):
+    return '[ItemToSell]\n' + ''.join(f"{item}={price}\n" for item, price in sorted(prices.items()))
+
+def generate(out_path, character="Replay", dumps=1000, satchels=8, slots=10, items=200,
+             spacing=30.0, sell_chance=0.02, restock_chance=0.5, reprice_every=100, seed=None):
+    """Write a synthetic recording; returns the number of entries"""
+    rng = random.Random(seed)
+    names = [f"Item {number:04d}" for number in range(items)]
+    prices = {name: rng.randrange(1, 500) * 100 for name in names}
+    next_id = 1000
+    satchel = {}
+    for general in range(1, satchels + 1):
+        for slot in range(1, slots + 1):
+            satchel[f"General{general}-Slot{slot}"] = (rng.choice(names), str(next_id))
+            next_id += 1
+    
+    timestamp = time.time()
+    with RecordingWriter(out_path, character, ground_truth=True) as writer:
+        writer.add(timestamp, BZR, _bzr_text(prices))
+        writer.add(timestamp, INVENTORY, _inventory_text(satchel))
+        for dump in range(1, dumps):
+            timestamp += spacing
+            if reprice_every and dump % reprice_every == 0:
+                for name in rng.sample(names, max(1, items // 20)):
+                    prices[name] = max(100, prices[name] + rng.randrange(-5, 6) * 100)
+                writer.add(timestamp - spacing / 2, BZR, _bzr_text(prices))
+            # A slot can sell and be refilled between two dumps
+            sold = []
+            for slot, item in satchel.items():
+                if item is not None and rng.random() < sell_chance:
+                    sold.append((slot,) + item)
+                    item = satchel[slot] = None
+                if item is None and rng.random() < restock_chance:
+                    satchel[slot] = (rng.choice(names), str(next_id))
+                    next_id += 1
+            if sold:
+                writer.add(timestamp, SOLD, json.dumps(sold))
+            writer.add(timestamp, INVENTORY, _inventory_text(satchel))
+        return writer.entries
+
+class ReplayMonitor:
+    """The monitor side of a replay: watch_inventory driving the SaleMonitor the window and the daemon use"""
+    
+    def __init__(self, character, inventory_file, bzr_file, interval):
+        self.interval = interval
+        self.sale_monitor = SaleMonitor(character, inventory_file, bzr_file)
+        self.sale_monitor.load()
+        self.running = True
+        self.sales = []  # (detection time, slot, item_name, item_id)
+        self.checks = 0
+        self.check_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.thread = threading.Thread(target=self._run, name="replay-monitor", daemon=True)
+    
+    def _run(self):
+        cpu_start = time.thread_time()
+        watch_inventory(self.sale_monitor.inventory_file, lambda: self.running, self.check_for_sales, self.interval)
+        self.cpu_seconds = time.thread_time() - cpu_start
+    
+    def check_for_sales(self):
+        started = time.perf_counter()
+        events, _, _, _ = self.sale_monitor.check()
+        self.sales.extend((event.timestamp, event.slot, event.item_name, event.item_id)
+                          for event in events if event.kind == SALE)
+        self.checks += 1
+        self.check_seconds += time.perf_counter() - started
+    
+    def start(self):
+        self.thread.start()
+    
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+def _slot_sales(previous, current):
+    """Items that left their slot between two dumps, for recordings without generated sales"""
+    return [(slot,) + item for slot, item in previous.items() if current.get(slot) != item]
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def replay(recording_path, speed=1.0, interval=POLL_INTERVAL, keep_root=None):
+    """Replay a recording against a monitor thread and return the report as a dict"""
+    entries = iter_recording(recording_path)
+    header = next(entries, None)
+    if header is None:
+        raise ValueError(f"{recording_path} is not a recording")
+    character = header['character']
+    ground_truth = header.get('ground_truth', False)
+    
+    root = keep_root or tempfile.mkdtemp(prefix="pq_replay_")
+    os.makedirs(root, exist_ok=True)
+    paths = {INVENTORY: os.path.join(root, inventory_filename(character)),
+             BZR: os.path.join(root, bzr_filename(character))}
+    
+    def write(kind, text):
+        with open(paths[kind], 'w', encoding='utf-8') as f:
+            f.write(text)
+    
+    try:
+        # The state before the first dump is the baseline the monitor loads, like "Load Character Data"
+        first_timestamp = None
+        for timestamp, kind, text in entries:
+            if kind == SOLD:
+                continue
+            write(kind, text)
+            if kind == INVENTORY:
+                first_timestamp = timestamp
+                break
+        if first_timestamp is None:
+            raise ValueError(f"{recording_path} has no inventory dumps")
+        
+        monitor = ReplayMonitor(character, paths[INVENTORY], paths[BZR], interval)
+        prices = dict(monitor.sale_monitor.item_prices)
+        previous = dict(monitor.sale_monitor.last_inventory)
+        expected = defaultdict(deque)  # (slot, item_name, item_id) -> write times
+        expected_sales = 0
+        truth = []  # generated sales since the last dump
+        dumps = 0
+        
+        wall_start = time.time()
+        cpu_start = time.process_time()
+        monitor.start()
+        for timestamp, kind, text in entries:
+            if kind == SOLD:
+                truth.extend(tuple(sale) for sale in json.loads(text))
+                continue
+            if speed > 0:
+                delay = wall_start + (timestamp - first_timestamp) / speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            write(kind, text)
+            written = time.time()
+            if kind == BZR:
+                prices = read_prices(paths[BZR])
+                continue
+            dumps += 1
+            # Expected sales come from the generator, not from the detector under test
+            if ground_truth:
+                sales, truth = truth, []
+            else:
+                current = read_inventory(paths[INVENTORY])
+                sales = _slot_sales(previous, current)
+                previous = current
+            for slot, item_name, item_id in sales:
+                if prices.get(item_name, 0) > 0:
+                    expected[(slot, item_name, item_id)].append(written)
+                    expected_sales += 1
+        
+        # Give the monitor a chance to pick up the final dump
+        final_fingerprint = file_fingerprint(paths[INVENTORY])
+        settle_deadline = time.time() + max(SETTLE_TIMEOUT, 3 * interval)
+        while monitor.sale_monitor.checked_fingerprint != final_fingerprint and time.time() < settle_deadline:
+            time.sleep(min(interval, 0.05))
+        monitor.stop()
+        wall_seconds = time.time() - wall_start
+        process_cpu = time.process_time() - cpu_start
+    finally:
+        if keep_root is None:
+            shutil.rmtree(root, ignore_errors=True)
+    
+    latencies = []
+    duplicated = 0
+    for detected, slot, item_name, item_id in monitor.sales:
+        queue = expected.get((slot, item_name, item_id))
+        if queue:
+            latencies.append(max(0.0, detected - queue.popleft()))
+        else:
+            duplicated += 1
+    latencies.sort()
+    
+    return {
+        'character': character,
+        'speed': speed,
+        'interval': interval,
+        'dumps_written': dumps,
+        'dumps_processed': monitor.checks,
+        'wall_seconds': wall_seconds,
+        'dumps_per_second': monitor.checks / wall_seconds if wall_seconds else 0.0,
+        'max_dumps_per_second': monitor.checks / monitor.check_seconds if monitor.check_seconds else 0.0,
+        'expected_sales': expected_sales,
+        'detected_sales': len(monitor.sales),
+        'missed_sales': sum(len(queue) for queue in expected.values()),
+        'duplicated_sales': duplicated,
+        'latency_mean': sum(latencies) / len(latencies) if latencies else None,
+        'latency_p50': _percentile(latencies, 0.5) if latencies else None,
+        'latency_p95': _percentile(latencies, 0.95) if latencies else None,
+        'latency_max': latencies[-1] if latencies else None,
+        'monitor_cpu_seconds': monitor.cpu_seconds,
+        'monitor_cpu_percent': 100.0 * monitor.cpu_seconds / wall_seconds if wall_seconds else 0.0,
+        'process_cpu_percent': 100.0 * process_cpu / wall_seconds if wall_seconds else 0.0,
+    }
+
+def format_report(report):
+    def ms(value):
+        return "n/a" if value is None else f"{value * 1000:.1f} ms"
+    
+    speed = "as fast as possible" if report['speed'] <= 0 else f"{report['speed']:g}x"
+    return '\n'.join([
+        f"Replay of {report['character']} at {speed}, polling every {report['interval']:g}s",
+        f"Dumps: {report['dumps_written']} written, {report['dumps_processed']} processed in {report['wall_seconds']:.1f}s "
+        f"({report['dumps_per_second']:.1f}/s; {report['max_dumps_per_second']:.0f}/s if checks ran back to back)",
+        f"Sales: {report['expected_sales']} expected, {report['detected_sales']} detected, "
+        f"{report['missed_sales']} missed, {report['duplicated_sales']} duplicated",
+        f"Detection latency: mean {ms(report['latency_mean'])}, p50 {ms(report['latency_p50'])}, "
+        f"p95 {ms(report['latency_p95'])}, max {ms(report['latency_max'])}",
+        f"CPU: monitor thread {report['monitor_cpu_seconds']:.2f}s ({report['monitor_cpu_percent']:.1f}%), "
+        f"whole process {report['process_cpu_percent']:.1f}%",
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay trader inventory dumps against the sale detector")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    record_parser = commands.add_parser('record', help="record a live session")
+    record_parser.add_argument('--root', required=True, help="folder holding the dump and BZR file")
+    record_parser.add_argument('--character', required=True)
+    record_parser.add_argument('--out', required=True, help="recording to write (.jsonl.gz)")
+    record_parser.add_argument('--interval', type=float, default=RECORD_INTERVAL)
+    record_parser.add_argument('--duration', type=float, help="seconds to record (default: until Ctrl-C)")
+    
+    generate_parser = commands.add_parser('generate', help="write a synthetic recording")
+    generate_parser.add_argument('--out', required=True)
+    generate_parser.add_argument('--dumps', type=int, default=1000)
+    generate_parser.add_argument('--satchels', type=int, default=8)
+    generate_parser.add_argument('--slots', type=int, default=10)
+    generate_parser.add_argument('--spacing', type=float, default=30.0, help="seconds between dumps")
+    generate_parser.add_argument('--seed', type=int)
+    
+    replay_parser = commands.add_parser('replay', help="replay a recording and report")
+    replay_parser.add_argument('recording')
+    replay_parser.add_argument('--speed', type=float, default=1.0, help="pace multiplier; 0 = as fast as possible")
+    replay_parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help="monitor poll interval in seconds")
+    replay_parser.add_argument('--keep', help="replay into this folder and leave it in place")
+    replay_parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    
+    args = parser.parse_args()
+    if args.command == 'record':
+        entries = record(args.root, args.character, args.out, args.interval, args.duration)
+        print(f"Recorded {entries} file versions to {args.out}")
+    elif args.command == 'generate':
+        entries = generate(args.out, dumps=args.dumps, satchels=args.satchels, slots=args.slots,
+                           spacing=args.spacing, seed=args.seed)
+        print(f"Wrote {entries} file versions to {args.out}")
+    else:
+        report = replay(args.recording, args.speed, args.interval, args.keep)
+        print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+if __name__ == "__main__":
+    main()
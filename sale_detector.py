@@ -0,0 +1,153 @@
+"""Sale detection shared by the monitor window and the tools that drive it"""
+import os
+import threading
+import time
+
+from event_bus import RESTOCK, SALE, make_event
+from listing_ages import ListingAges
+from pq_files import iter_inventory_items, parse_bzr_items
+from warm_cache import file_fingerprint
+
+POLL_INTERVAL = 2.0  # seconds between stats of the inventory dump
+
+def read_inventory(path):
+    """Return {slot: (item_name, item_id)} for the trader satchels in a dump"""
+    if not os.path.exists(path):
+        return {}
+    return {slot: (item_name, item_id) for slot, item_name, item_id in iter_inventory_items(path)}
+
+def read_prices(path):
+    """Return {item: price in platinum} from a BZR file"""
+    return {item: copper / 1000.0 for item, copper in parse_bzr_items(path).items()}
+
+def detect_changes(trader, last_inventory, current_inventory, item_prices, log=None, timestamp=None):
+    """Diff two inventories; returns (events, sold slots, restocked slots)"""
+    # A slot that emptied or now holds a different item sold its previous item; priced sales become events.
+    # A slot that was filled or changed is a restock, reported once there is a previous inventory.
+    log = log or (lambda message: None)
+    timestamp = time.time() if timestamp is None else timestamp
+    events = []
+    
+    sold = [(slot, item_name, item_id) for slot, (item_name, item_id) in last_inventory.items()
+            if current_inventory.get(slot) != (item_name, item_id)]
+    for slot, item_name, item_id in sold:
+        log(f"Item sold from {slot}: {item_name} (ID: {item_id})")
+        if item_prices.get(item_name, 0) > 0:
+            price = round(item_prices[item_name] * 1000)
+            events.append(make_event(SALE, trader, slot, item_name, item_id, price, timestamp))
+        elif item_name in item_prices:
+            log(f"Sold item has 0 price, ignoring: {item_name}")
+        else:
+            log(f"Sold item not in price list, ignoring: {item_name}")
+    
+    restocked = [(slot, item) for slot, item in current_inventory.items() if last_inventory.get(slot) != item]
+    if last_inventory:
+        for slot, (item_name, item_id) in restocked:
+            price = round(item_prices.get(item_name, 0) * 1000)
+            events.append(make_event(RESTOCK, trader, slot, item_name, item_id, price, timestamp))
+    
+    log(f"Items sold: {len(sold)}")
+    return events, sold, restocked
+
+class SaleMonitor:
+    """One trader's prices and last inventory, checked against each new dump by the window, the daemon and the harness"""
+    
+    def __init__(self, trader, inventory_file, bzr_file, load_prices=read_prices, load_inventory=read_inventory, log=None):
+        self.trader = trader
+        self.inventory_file = inventory_file
+        self.bzr_file = bzr_file
+        self.load_prices = load_prices  # path -> {item: price in platinum}
+        self.load_inventory = load_inventory  # path -> {slot: (item_name, item_id)}
+        self.log = log or (lambda message: None)
+        self.item_prices = {}
+        self.last_inventory = {}
+        self.file_fingerprints = {}  # path -> fingerprint of the parsed state
+        self.last_change_time = None
+        self.listing_ages = ListingAges()  # hosts load and save it; read it under the lock
+        self.checked_fingerprint = None  # the dump the last check read
+        self.lock = threading.Lock()
+    
+    def load(self):
+        """Read the prices and take the current dump as the last inventory"""
+        self.reload_prices()
+        # Fingerprint before reading so a write during the read is picked up by the next check
+        inventory_fingerprint = file_fingerprint(self.inventory_file)
+        inventory = self.load_inventory(self.inventory_file)
+        with self.lock:
+            self.file_fingerprints[self.inventory_file] = inventory_fingerprint
+            self.last_inventory = inventory
+    
+    def cache_state(self):
+        """The state a host saves to pick up where it left off"""
+        with self.lock:
+            return {'file_fingerprints': dict(self.file_fingerprints), 'item_prices': self.item_prices,
+                    'last_inventory': self.last_inventory, 'last_change_time': self.last_change_time}
+    
+    def restore(self, state):
+        """Take back a saved cache_state(); prices or fingerprints it lacks stay as they are"""
+        with self.lock:
+            self.item_prices = state.get('item_prices', self.item_prices)
+            self.last_inventory = {slot: tuple(item) for slot, item in state['last_inventory'].items()}
+            self.file_fingerprints = state.get('file_fingerprints', self.file_fingerprints)
+            self.last_change_time = state.get('last_change_time')
+    
+    def reload_prices(self):
+        """Read the BZR file again; a missing file means no prices"""
+        bzr_fingerprint = file_fingerprint(self.bzr_file)
+        prices = self.load_prices(self.bzr_file) if os.path.exists(self.bzr_file) else {}
+        with self.lock:
+            self.file_fingerprints[self.bzr_file] = bzr_fingerprint
+            self.item_prices = prices
+    
+    def check(self, timestamp=None):
+        """Pick up a changed BZR file and diff the dump against the last one; returns (events, sold, restocked, prices changed)"""
+        # Files are read and messages logged outside the lock, which only guards the state; the window's
+        # log goes through Tk, and the Tk thread takes the lock to read the listing ages
+        bzr_fingerprint = file_fingerprint(self.bzr_file)
+        prices = None
+        if bzr_fingerprint is not None and bzr_fingerprint != self.file_fingerprints.get(self.bzr_file):
+            prices = self.load_prices(self.bzr_file)
+        inventory_fingerprint = file_fingerprint(self.inventory_file)
+        current_inventory = self.load_inventory(self.inventory_file)
+        
+        messages = []
+        with self.lock:
+            if prices is not None:
+                self.item_prices = prices
+                self.file_fingerprints[self.bzr_file] = bzr_fingerprint
+                messages.append(f"BZR file changed, reloaded {len(prices)} prices")
+            messages.append(f"Previous inventory: {len(self.last_inventory)} items")
+            messages.append(f"Current inventory: {len(current_inventory)} items")
+            # Diffing under the lock means two overlapping checks never report the same change twice
+            events, sold, restocked = detect_changes(self.trader, self.last_inventory, current_inventory, self.item_prices,
+                                                     log=messages.append, timestamp=timestamp)
+            if sold or restocked:
+                self.last_inventory = current_inventory
+                self.file_fingerprints[self.inventory_file] = inventory_fingerprint
+                self.last_change_time = time.time()
+                self.listing_ages.apply(sold, restocked, self.last_change_time)
+            self.checked_fingerprint = inventory_fingerprint
+        for message in messages:
+            self.log(message)
+        return events, sold, restocked, prices is not None
+    
+def watch_inventory(path, is_running, on_change, interval=POLL_INTERVAL, log=None):
+    """Call on_change() each time the dump's fingerprint changes, until is_running() is false"""
+    log = log or (lambda message: None)
+    last_fingerprint = file_fingerprint(path)
+    log(f"Monitoring started, file fingerprint: {last_fingerprint}")
+    
+    while is_running():
+        try:
+            fingerprint = file_fingerprint(path)
+            # A dump being rewritten is empty for a moment; reading it then would look like every slot sold
+            if fingerprint is not None and fingerprint[1] > 0 and fingerprint != last_fingerprint:
+                log(f"File modified! Old: {last_fingerprint}, New: {fingerprint}")
+                on_change()
+                last_fingerprint = fingerprint
+            
+            time.sleep(interval)
+        
+        except Exception as e:
+            log(f"Error monitoring file: {str(e)}")
+            break
@@ -0,0 +1,50 @@
+"""Sorted orderings of the items view that are maintained with bisect"""
+import re
+from bisect import bisect_left
+
+_NUMBER_SPLIT_RE = re.compile(r'(\d+)')
+
+def natural_key(text):
+    """Sort key that orders General2-Slot10 after General2-Slot9"""
+    return tuple((0, int(part)) if part.isdigit() else (1, part.lower())
+                 for part in _NUMBER_SPLIT_RE.split(text) if part)
+
+class SortedView:
+    def __init__(self, sort_key):
+        self.sort_key = sort_key  # (row_key, row) -> comparable key
+        self.entries = []  # sorted (sort_key, row_key)
+        self.row_sort_keys = {}  # row_key -> its sort key in entries
+    
+    def upsert(self, row_key, row):
+        """Insert a row or move it to its new position; returns its index"""
+        self.remove(row_key)
+        key = self.sort_key(row_key, row)
+        entry = (key, row_key)
+        index = bisect_left(self.entries, entry)
+        self.entries.insert(index, entry)
+        self.row_sort_keys[row_key] = key
+        return index
+    
+    def remove(self, row_key):
+        key = self.row_sort_keys.pop(row_key, None)
+        if key is None:
+            return
+        index = bisect_left(self.entries, (key, row_key))
+        del self.entries[index]
+    
+    def index(self, row_key):
+        """Position of a row in ascending order"""
+        return bisect_left(self.entries, (self.row_sort_keys[row_key], row_key))
+    
+    def order(self, descending=False):
+        """Row keys in sort order"""
+        keys = [row_key for _, row_key in self.entries]
+        if descending:
+            keys.reverse()
+        return keys
+    
+    def __contains__(self, row_key):
+        return row_key in self.row_sort_keys
+    
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,52 @@
+import pytest
+
+from bulk_export import PRICE_COLUMNS, export_prices, iter_price_blocks
+from columnar_io import INT, STR, ColumnarReader, ColumnarWriter, CsvReader, CsvWriter
+
+COLUMNS = [('name', STR), ('count', INT), ('note', STR)]
+ROWS = [(f"Item {i % 7}", i * 1000 - 5, "é" if i % 3 else "") for i in range(25)]
+
+@pytest.mark.parametrize('suffix', ['.csv', '.pqc'])
+def test_round_trip_over_several_blocks(tmp_path, suffix):
+    path = str(tmp_path / ('rows' + suffix))
+    if suffix == '.pqc':
+        writer, reader = ColumnarWriter(path, COLUMNS, block_rows=10), lambda: ColumnarReader(path)
+    else:
+        writer, reader = CsvWriter(path, COLUMNS), lambda: CsvReader(path, COLUMNS, block_rows=10)
+    with writer:
+        writer.write_rows(ROWS)
+    assert writer.rows_written == len(ROWS)
+    
+    with reader() as r:
+        assert [len(block['name']) for block in r.iter_blocks()] == [10, 10, 5]
+    with reader() as r:
+        assert list(r.iter_rows()) == ROWS
+
+@pytest.mark.parametrize('suffix', ['.csv', '.pqc'])
+def test_empty_file(tmp_path, suffix):
+    path = str(tmp_path / ('prices' + suffix))
+    assert export_prices({}, path) == 0
+    assert list(iter_price_blocks(path)) == []
+
+def test_columnar_reads_only_requested_columns(tmp_path):
+    path = str(tmp_path / 'rows.pqc')
+    with ColumnarWriter(path, COLUMNS) as writer:
+        writer.write_rows(ROWS)
+    with ColumnarReader(path, [('count', INT)]) as reader:
+        assert list(reader.iter_rows()) == [(row[1],) for row in ROWS]
+    with pytest.raises(ValueError):
+        ColumnarReader(path, [('missing', INT)])
+
+def test_prices_round_trip(tmp_path):
+    prices = {'Sword': 100, 'Shield': 0, 'Helm': 2 ** 40}
+    for suffix in ('.csv', '.pqc'):
+        path = str(tmp_path / ('prices' + suffix))
+        assert export_prices(prices, path) == 3
+        blocks = list(iter_price_blocks(path))
+        assert blocks == [prices]
+
+def test_csv_named_pqc_is_rejected(tmp_path):
+    path = tmp_path / 'prices.pqc'
+    path.write_text('item,price\nSword,100\n')
+    with pytest.raises(ValueError):
+        list(iter_price_blocks(str(path)))
@@ -0,0 +1,20 @@
+from listing_ages import apply_markdowns
+from pq_files import parse_bzr_items, write_bzr_items
+from price_book import PriceBook
+
+def test_markdowns_go_through_the_book(tmp_path):
+    book = PriceBook(str(tmp_path))
+    book.add_mule('A')
+    book.add_mule('B')
+    book.update_prices({'X': 100, 'Y': 200, 'Z': 300})
+    book.regenerate(create=True)
+    write_bzr_items(book.mule_file('B'), {'X': 100, 'Y': 150, 'Z': 300})  # edited in game
+    write_bzr_items(book.mule_file('A'), {'X': 100, 'Y': 200, 'Z': 250})
+    
+    proposals = {'X': (100, 90, 0), 'Z': (300, 270, 0)}  # Z changed in A's file since it was proposed
+    applied = apply_markdowns(book, 'A', proposals)
+    
+    assert applied == {'X': (100, 90)}
+    assert book.prices == {'X': 90, 'Y': 200, 'Z': 300}
+    assert parse_bzr_items(book.mule_file('A')) == {'X': 90, 'Y': 200, 'Z': 250}
+    assert parse_bzr_items(book.mule_file('B')) == {'X': 90, 'Y': 150, 'Z': 300}
@@ -0,0 +1,44 @@
+import os
+
+from market_data import MarketIndex, load_market_index, recommend_undercuts
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SAMPLES = [os.path.join(DATA, 'market_sample.txt'), os.path.join(DATA, 'market_sample.csv')]
+
+def test_ingest_sample_files():
+    index = load_market_index(SAMPLES, ignore_traders=['mymule'])
+    # The malformed line, the zero price and our own mule's listing are skipped
+    assert index.observations == 6
+    assert sorted(index.samples) == ['Bronze Ring', 'Cloth Cap', 'Rusty Dagger']
+    assert index.latest == 1700000700
+
+def test_lookup_by_name_or_item_id():
+    index = load_market_index(SAMPLES, ignore_traders=['mymule'])
+    # The nameless listing is pooled under the name first seen for its ID
+    assert len(index.samples['Rusty Dagger']) == 2
+    assert index.market_price('2002') == index.market_price('Rusty Dagger') == 450
+    assert index.market_price('9999') is None
+
+def test_recent_listings_outweigh_old_ones():
+    index = MarketIndex()
+    index.add(0, 'Old', 'Cloth Cap', '1001', 100)
+    index.add(30 * 24 * 3600, 'New', 'Cloth Cap', '1001', 1000)
+    assert index.market_price('Cloth Cap') == 1000
+    assert index.market_price('Cloth Cap', half_life=10 ** 9) == 100
+
+def test_recommendations_only_lower_prices():
+    index = load_market_index(SAMPLES, ignore_traders=['mymule'])
+    recommendations = recommend_undercuts(index, {'Cloth Cap': 2000, 'Bronze Ring': 20000, 'Unknown': 100})
+    assert list(recommendations) == ['Cloth Cap']
+    current, market, recommended = recommendations['Cloth Cap']
+    assert (current, market) == (2000, 900)
+    assert recommended == 1000  # held at half of the current price
+
+def test_floor_holds_over_repeated_applies():
+    index = load_market_index(SAMPLES, ignore_traders=['mymule'])
+    prices = {'Cloth Cap': 2000}
+    floors = {'Cloth Cap': 2000}
+    for _ in range(3):
+        for item, (_, _, recommended) in recommend_undercuts(index, prices, floors=floors).items():
+            prices[item] = recommended
+    assert prices['Cloth Cap'] == 1000
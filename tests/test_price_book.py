@@ -0,0 +1,53 @@
+from pq_files import parse_bzr_items, write_bzr_items
+from price_book import PriceBook, literal_pattern
+
+def make_book(folder):
+    book = PriceBook(str(folder))
+    book.add_mule('A')
+    book.add_mule('B', exclude=[literal_pattern('Z')])
+    book.update_prices({'X': 100, 'Y': 200, 'Z': 300})
+    return book
+
+def test_round_trip(tmp_path):
+    book = make_book(tmp_path)
+    written = book.regenerate(create=True)
+    book.save()
+    
+    loaded = PriceBook.load(str(tmp_path))
+    assert loaded.prices == book.prices
+    assert loaded.mules == book.mules
+    assert loaded.projection_digests == book.projection_digests
+    assert parse_bzr_items(loaded.mule_file('A')) == {'X': 100, 'Y': 200, 'Z': 300}
+    assert parse_bzr_items(loaded.mule_file('B')) == {'X': 100, 'Y': 200}
+    assert set(written) == {'A', 'B'}
+    # Nothing changed, so nothing is rewritten
+    assert loaded.regenerate() == {}
+
+def test_removed_items_are_not_projected(tmp_path):
+    book = make_book(tmp_path)
+    book.regenerate(create=True)
+    assert book.remove_prices(['Y', 'missing']) == {'Y': (200, None)}
+    book.regenerate()
+    assert parse_bzr_items(book.mule_file('A')) == {'X': 100, 'Z': 300}
+
+def test_patching_keeps_edits_made_in_game(tmp_path):
+    book = make_book(tmp_path)
+    book.regenerate(create=True)
+    write_bzr_items(book.mule_file('A'), {'X': 100, 'Y': 150, 'Z': 300})
+    
+    mules = book.set_price('X', 90)
+    written = book.regenerate(mules=mules, items=['X'])
+    assert set(written) == {'A', 'B'}
+    assert parse_bzr_items(book.mule_file('A')) == {'X': 90, 'Y': 150, 'Z': 300}
+    assert parse_bzr_items(book.mule_file('B')) == {'X': 90, 'Y': 200}
+
+def test_unpriced_items_stay_on_the_mules_naming_them(tmp_path):
+    book = make_book(tmp_path)
+    book.update_prices({'Rag': 0})
+    assert 'Rag' not in book.projection('A')
+    book.include_items('A', ['Rag'])
+    assert book.projection('A')['Rag'] == 0
+    assert 'Rag' not in book.projection('B')
+    assert book.mules_listing('Rag') == ['A']
+    book.forget_items('A', ['Rag'])
+    assert 'Rag' not in book.projection('A')
@@ -0,0 +1,32 @@
+from price_journal import SOURCE_MANUAL, SOURCE_MARKDOWN, SOURCE_SYNC, PriceJournal
+
+def test_two_writers_share_names(tmp_path):
+    first = PriceJournal.open(str(tmp_path))
+    second = PriceJournal.open(str(tmp_path))
+    first.record({'Alpha': (None, 100)}, SOURCE_SYNC, timestamp=10)
+    # second has not seen Alpha; it must not reuse Alpha's item number for Beta
+    second.record({'Beta': (None, 200)}, SOURCE_MARKDOWN, timestamp=20)
+    first.record({'Gamma': (None, 300), 'Beta': (200, 180)}, SOURCE_MANUAL, timestamp=30)
+    second.record({'Gamma': (300, 250)}, SOURCE_MARKDOWN, timestamp=40)
+    
+    loaded = PriceJournal.open(str(tmp_path))
+    assert loaded.names == ['Alpha', 'Beta', 'Gamma']
+    assert len(loaded) == 5
+    assert loaded.history('Alpha') == [(10, 'Alpha', None, 100, SOURCE_SYNC)]
+    assert loaded.history('Beta') == [(20, 'Beta', None, 200, SOURCE_MARKDOWN), (30, 'Beta', 200, 180, SOURCE_MANUAL)]
+    assert loaded.history('Gamma') == [(30, 'Gamma', None, 300, SOURCE_MANUAL), (40, 'Gamma', 300, 250, SOURCE_MARKDOWN)]
+    
+    first.refresh()
+    assert first.history('Gamma') == loaded.history('Gamma')
+    assert first.changes_between(0) == loaded.changes_between(0)
+
+def test_partial_record_is_dropped(tmp_path):
+    journal = PriceJournal.open(str(tmp_path))
+    journal.record({'Alpha': (None, 100)}, SOURCE_SYNC, timestamp=10)
+    with open(journal._column_path('timestamps'), 'ab') as f:
+        f.write(b'\x01\x00\x00\x00')  # an append interrupted after its first column
+    
+    loaded = PriceJournal.open(str(tmp_path))
+    assert len(loaded) == 1
+    loaded.record({'Alpha': (100, 90)}, SOURCE_MANUAL, timestamp=20)
+    assert PriceJournal.open(str(tmp_path)).history('Alpha')[-1] == (20, 'Alpha', 100, 90, SOURCE_MANUAL)
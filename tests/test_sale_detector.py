@@ -0,0 +1,64 @@
+import os
+
+from event_bus import RESTOCK, SALE
+from pq_files import write_bzr_items
+from sale_detector import SaleMonitor, detect_changes
+
+PRICES = {'Sword': 12.5, 'Shield': 8.0, 'Rag': 0}
+
+def kinds(events):
+    return [(event.kind, event.slot, event.item_name) for event in events]
+
+def test_emptied_slot_is_a_sale():
+    events, sold, restocked = detect_changes('T', {'General1-Slot1': ('Sword', '1')}, {}, PRICES, timestamp=1)
+    assert kinds(events) == [(SALE, 'General1-Slot1', 'Sword')]
+    assert events[0].price == 12500
+    assert sold == [('General1-Slot1', 'Sword', '1')]
+    assert restocked == []
+
+def test_sale_and_refill_in_one_slot():
+    last = {'General1-Slot1': ('Sword', '1'), 'General1-Slot2': ('Shield', '2')}
+    current = {'General1-Slot1': ('Shield', '3'), 'General1-Slot2': ('Shield', '2')}
+    events, sold, restocked = detect_changes('T', last, current, PRICES, timestamp=1)
+    assert kinds(events) == [(SALE, 'General1-Slot1', 'Sword'), (RESTOCK, 'General1-Slot1', 'Shield')]
+    assert sold == [('General1-Slot1', 'Sword', '1')]
+    assert restocked == [('General1-Slot1', ('Shield', '3'))]
+
+def test_same_name_new_id_is_a_sale():
+    events, _, _ = detect_changes('T', {'General1-Slot1': ('Sword', '1')}, {'General1-Slot1': ('Sword', '4')}, PRICES)
+    assert kinds(events) == [(SALE, 'General1-Slot1', 'Sword'), (RESTOCK, 'General1-Slot1', 'Sword')]
+
+def test_unpriced_sales_are_not_events():
+    events, sold, _ = detect_changes('T', {'General1-Slot1': ('Rag', '5'), 'General1-Slot2': ('Junk', '6')}, {}, PRICES)
+    assert events == []
+    assert len(sold) == 2
+
+def test_unchanged_inventory():
+    inventory = {'General1-Slot1': ('Sword', '1')}
+    assert detect_changes('T', inventory, dict(inventory), PRICES) == ([], [], [])
+
+def write_dump(path, items):
+    with open(path, 'w', encoding='utf-8') as f:
+        for slot, (item_name, item_id) in items.items():
+            f.write(f"{slot}\t{item_name}\t{item_id}\t1\t1\n")
+
+def test_sale_monitor_checks_each_new_dump(tmp_path):
+    inventory_file = str(tmp_path / 'T-Inventory.txt')
+    bzr_file = str(tmp_path / 'BZR_T_pq.proj.ini')
+    write_bzr_items(bzr_file, {'Sword': 12500})
+    write_dump(inventory_file, {'General1-Slot1': ('Sword', '1'), 'General1-Slot2': ('Shield', '2')})
+    monitor = SaleMonitor('T', inventory_file, bzr_file)
+    monitor.load()
+    assert monitor.item_prices == {'Sword': 12.5}
+    
+    # The BZR file is repriced and Sword sells, all between two checks
+    write_bzr_items(bzr_file, {'Sword': 11000, 'Shield': 8000})
+    os.utime(bzr_file, (1, 1))
+    write_dump(inventory_file, {'General1-Slot2': ('Shield', '2')})
+    events, sold, restocked, prices_changed = monitor.check(timestamp=5)
+    assert prices_changed
+    assert kinds(events) == [(SALE, 'General1-Slot1', 'Sword')]
+    assert events[0].price == 11000
+    assert monitor.last_inventory == {'General1-Slot2': ('Shield', '2')}
+    
+    assert monitor.check() == ([], [], [], False)
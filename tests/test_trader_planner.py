@@ -0,0 +1,18 @@
+from collections import Counter
+
+from trader_planner import holdings, plan_distribution, stock_counts
+
+def test_units_stay_on_their_holder_while_it_has_room():
+    inventories = {'A': {'s1': ('Sword', '1'), 's2': ('Shield', '2'), 's3': ('Helm', '3')}, 'B': {}}
+    prices = {'Sword': 300, 'Shield': 200, 'Helm': 100}
+    plan = plan_distribution(prices, stock_counts(inventories), {'A': 2, 'B': 2}, held=holdings(inventories))
+    assert plan.assignments['A'] == Counter({'Sword': 1, 'Shield': 1})
+    assert plan.assignments['B'] == Counter({'Helm': 1})
+    assert plan.moves == [('Helm', 'A', 'B', 1)]
+
+def test_no_holdings_balances_by_weight():
+    plan = plan_distribution({'X': 100, 'Y': 60, 'Z': 50, 'Free': 0}, None, {'A': 5, 'B': 5})
+    assert plan.assignments['A'] == Counter({'X': 1})
+    assert plan.assignments['B'] == Counter({'Y': 1, 'Z': 1})
+    assert plan.moves == []
+    assert plan.unstocked == []
@@ -4,10 +4,32 @@ import os
 import time
 import threading
 from datetime import datetime
-from pathlib import Path
 import re
 import configparser
-import webbrowser
+
+from pq_files import iter_inventory_items, listings_filename, parse_bzr_items, sales_ledger_filename
+from warm_cache import fingerprints_match, load_cache, save_cache
+from item_index import NgramIndex
+from sorted_view import SortedView, natural_key
+from event_bus import SALE, EventBus
+from event_sinks import DebugSink, LedgerSink, NotificationSink, SocketSink, TextLogSink, WebhookSink, event_to_dict
+from sale_detector import SaleMonitor, watch_inventory
+from listing_ages import DEFAULT_MARKDOWN_PCT, DEFAULT_STALE_DAYS, ListingAges, apply_markdowns, propose_markdowns
+from price_book import PriceBook
+from price_journal import SOURCE_MARKDOWN, PriceJournal
+
+def _item_id_key(item_id):
+    return (int(item_id), item_id) if item_id.isdigit() else (-1, item_id)
+
+# Sortable items columns: column id -> (heading, sort key over slot and display row)
+# A display row is (item_name, item_id, price, listed_since)
+SORT_COLUMNS = {
+    '#0': ('Item Name', lambda slot, row: (row[0].lower(), row[1])),
+    'price': ('Price', lambda slot, row: row[2]),
+    'item_id': ('Item ID', lambda slot, row: _item_id_key(row[1])),
+    'slot': ('Slot', lambda slot, row: natural_key(slot)),
+    'listed': ('Listed', lambda slot, row: row[3]),
+}
 
 class TraderMonitor:
     def __init__(self, root):
@@ -18,14 +40,29 @@ class TraderMonitor:
         
         # Configuration file path
         self.config_file = "trader_monitor_config.ini"
+        self.cache_file = "trader_monitor_cache.json"
         
         # Data storage
         self.character_name = ""
         self.root_directory = ""
         self.bzr_file = ""
         self.inventory_file = ""
-        self.item_prices = {}
-        self.last_inventory = {}
+        self.sink_settings = {'notifications': False, 'webhook_url': '', 'socket_address': ''}
+        self.api_settings = {'enabled': False, 'port': 8765}
+        self.daemon_settings = {'port': 8766}
+        self.daemon_client = None
+        self.stale_settings = {'days': DEFAULT_STALE_DAYS, 'markdown_pct': DEFAULT_MARKDOWN_PCT}
+        self.api_server = None
+        self.api_store = None
+        # Prices, last inventory and the sale check, shared with the daemon and the replay harness
+        self.sale_monitor = SaleMonitor("", "", "", load_prices=lambda path: self.load_bzr_file(),
+                                        load_inventory=lambda path: self.load_inventory_file(), log=self.debug_log_message)
+        self.item_index = NgramIndex()  # slot -> "name<TAB>id" of the displayed rows
+        self.display_rows = {}  # slot -> (item_name, item_id, price, listed_since) on screen
+        # One ordering per sortable column, all kept current as rows change
+        self.sort_views = {column: SortedView(sort_key) for column, (_, sort_key) in SORT_COLUMNS.items()}
+        self.sort_column = 'slot'
+        self.sort_descending = False
         self.monitoring = False
         self.monitor_thread = None
         
@@ -34,6 +71,11 @@ class TraderMonitor:
         
         self.setup_ui()
         
+        # Sale and restock events go to the sinks through the event bus
+        self.event_bus = EventBus(on_error=self.on_sink_error)
+        self.setup_event_sinks()
+        self.start_api_server()
+        
         # Apply loaded configuration to UI
         self.apply_config_to_ui()
         
@@ -85,14 +127,38 @@ class TraderMonitor:
         tree_frame = ttk.Frame(main_frame)
         tree_frame.grid(row=4, column=1, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(5, 0))
         tree_frame.columnconfigure(0, weight=1)
-        tree_frame.rowconfigure(0, weight=1)
-        
-        self.items_tree = ttk.Treeview(tree_frame, columns=('price', 'pqdi'), show='tree headings', height=6)
-        self.items_tree.heading('#0', text='Item Name')
-        self.items_tree.heading('price', text='Price')
+        tree_frame.rowconfigure(1, weight=1)
+        
+        # Search-as-you-type filter over item name and ID
+        filter_frame = ttk.Frame(tree_frame)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 3))
+        filter_frame.columnconfigure(1, weight=1)
+        ttk.Label(filter_frame, text="Filter:").grid(row=0, column=0, padx=(0, 5))
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', self.apply_filter)
+        ttk.Entry(filter_frame, textvariable=self.filter_var).grid(row=0, column=1, sticky=(tk.W, tk.E))
+        self.filter_count_label = ttk.Label(filter_frame, text="", foreground="gray")
+        self.filter_count_label.grid(row=0, column=2, padx=(5, 0))
+        
+        # Listings unsold for longer than the given number of days
+        self.stale_only_var = tk.BooleanVar(value=False)
+        self.stale_only_var.trace_add('write', self.apply_filter)
+        self.stale_days_var = tk.StringVar(value=f"{self.stale_settings['days']:g}")
+        self.stale_days_var.trace_add('write', self.apply_filter)
+        ttk.Checkbutton(filter_frame, text="Stale only, listed over", variable=self.stale_only_var).grid(row=0, column=3, padx=(10, 5))
+        ttk.Entry(filter_frame, textvariable=self.stale_days_var, width=4).grid(row=0, column=4)
+        ttk.Label(filter_frame, text="days").grid(row=0, column=5, padx=(5, 0))
+        
+        self.items_tree = ttk.Treeview(tree_frame, columns=('price', 'item_id', 'slot', 'listed', 'pqdi'), show='tree headings', height=6)
+        for column in SORT_COLUMNS:
+            self.items_tree.heading(column, command=lambda c=column: self.sort_items_by(c))
+        self.update_sort_headings()
         self.items_tree.heading('pqdi', text='PQDI')
-        self.items_tree.column('#0', width=350)
-        self.items_tree.column('price', width=100)
+        self.items_tree.column('#0', width=300)
+        self.items_tree.column('price', width=80)
+        self.items_tree.column('item_id', width=60)
+        self.items_tree.column('slot', width=110)
+        self.items_tree.column('listed', width=100)
         self.items_tree.column('pqdi', width=50)
         
         # Configure alternating row colors
@@ -108,8 +174,8 @@ class TraderMonitor:
         tree_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.items_tree.yview)
         self.items_tree.configure(yscrollcommand=tree_scrollbar.set)
         
-        self.items_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        tree_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.items_tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        tree_scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
         
         # Monitor buttons
         monitor_frame = ttk.Frame(main_frame)
@@ -118,7 +184,16 @@ class TraderMonitor:
         self.monitor_button = ttk.Button(monitor_frame, text="Start Monitoring", command=self.toggle_monitoring)
         self.monitor_button.pack(side=tk.LEFT, padx=(0, 5))
         
-        ttk.Button(monitor_frame, text="Manual Check", command=self.manual_check).pack(side=tk.LEFT)
+        ttk.Button(monitor_frame, text="Manual Check", command=self.manual_check).pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.attach_button = ttk.Button(monitor_frame, text="Attach to Daemon", command=self.toggle_daemon_attach)
+        self.attach_button.pack(side=tk.LEFT, padx=(0, 15))
+        
+        ttk.Button(monitor_frame, text="Mark Down Stale", command=self.markdown_stale_listings).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Label(monitor_frame, text="by").pack(side=tk.LEFT, padx=(0, 5))
+        self.markdown_pct_var = tk.StringVar(value=f"{self.stale_settings['markdown_pct']:g}")
+        ttk.Entry(monitor_frame, textvariable=self.markdown_pct_var, width=4).pack(side=tk.LEFT)
+        ttk.Label(monitor_frame, text="%").pack(side=tk.LEFT, padx=(2, 0))
         
         # Sales log
         ttk.Label(main_frame, text="Sales Log:").grid(row=6, column=0, sticky=(tk.W, tk.N), pady=(0, 5))
@@ -183,7 +258,7 @@ class TraderMonitor:
         region = self.items_tree.identify_region(event.x, event.y)
         if region == "cell":
             column = self.items_tree.identify_column(event.x)
-            if column == '#2':  # PQDI column (second value column)
+            if column != '#0' and self.items_tree.column(column, 'id') == 'pqdi':  # PQDI column
                 item = self.items_tree.identify_row(event.y)
                 if item:
                     # Extract item ID from the item text
@@ -193,6 +268,7 @@ class TraderMonitor:
                     if match:
                         item_id = match.group(1)
                         url = f"https://www.pqdi.cc/item/{item_id}"
+                        import webbrowser
                         webbrowser.open(url)
                         self.debug_log_message(f"Opened PQDI link for item ID {item_id}")
     
@@ -201,7 +277,7 @@ class TraderMonitor:
         region = self.items_tree.identify_region(event.x, event.y)
         if region == "cell":
             column = self.items_tree.identify_column(event.x)
-            if column == '#2':  # PQDI column
+            if column != '#0' and self.items_tree.column(column, 'id') == 'pqdi':  # PQDI column
                 self.items_tree.config(cursor="hand2")
             else:
                 self.items_tree.config(cursor="")
@@ -218,6 +294,28 @@ class TraderMonitor:
                 if 'Settings' in config:
                     self.character_name = config['Settings'].get('character_name', '')
                     self.root_directory = config['Settings'].get('root_directory', '')
+                
+                if 'Api' in config:
+                    self.api_settings = {
+                        'enabled': config['Api'].getboolean('enabled', False),
+                        'port': config['Api'].getint('port', 8765),
+                    }
+                
+                if 'Daemon' in config:
+                    self.daemon_settings = {'port': config['Daemon'].getint('port', 8766)}
+                
+                if 'Stale' in config:
+                    self.stale_settings = {
+                        'days': config['Stale'].getfloat('days', DEFAULT_STALE_DAYS),
+                        'markdown_pct': config['Stale'].getfloat('markdown_pct', DEFAULT_MARKDOWN_PCT),
+                    }
+                
+                if 'Sinks' in config:
+                    self.sink_settings = {
+                        'notifications': config['Sinks'].getboolean('notifications', False),
+                        'webhook_url': config['Sinks'].get('webhook_url', ''),
+                        'socket_address': config['Sinks'].get('socket_address', ''),
+                    }
             # If no config file exists, just use empty defaults (no error)
         except Exception as e:
             # If there's an error, just use empty defaults and continue
@@ -232,6 +330,22 @@ class TraderMonitor:
                 'character_name': self.character_name,
                 'root_directory': self.root_directory
             }
+            config['Api'] = {
+                'enabled': 'yes' if self.api_settings['enabled'] else 'no',
+                'port': str(self.api_settings['port'])
+            }
+            config['Daemon'] = {
+                'port': str(self.daemon_settings['port'])
+            }
+            config['Stale'] = {
+                'days': f"{self.stale_settings['days']:g}",
+                'markdown_pct': f"{self.stale_settings['markdown_pct']:g}"
+            }
+            config['Sinks'] = {
+                'notifications': 'yes' if self.sink_settings['notifications'] else 'no',
+                'webhook_url': self.sink_settings['webhook_url'],
+                'socket_address': self.sink_settings['socket_address']
+            }
             
             with open(self.config_file, 'w') as f:
                 config.write(f)
@@ -256,8 +370,43 @@ class TraderMonitor:
             self.status_var.set(f"Loaded previous session: {self.character_name}")
             # Now it's safe to log
             self.debug_log_message(f"Restored session - Character: {self.character_name}")
+            self.warm_start()
         else:
             self.status_var.set("Enter character name and select directory to begin")
+    
+    def warm_start(self):
+        """Restore the last parsed prices and inventory if the files are unchanged"""
+        state = load_cache(self.cache_file, 'trader_monitor')
+        if not state:
+            return False
+        if state.get('character_name') != self.character_name or state.get('root_directory') != self.root_directory:
+            return False
+        fingerprints = state.get('file_fingerprints', {})
+        if set(fingerprints) != {self.bzr_file, self.inventory_file} or not fingerprints_match(fingerprints):
+            self.debug_log_message("Cached data is out of date, load character data to refresh")
+            return False
+        
+        self.sale_monitor.restore(state)
+        self.load_listing_ages()
+        self.update_items_display(self.sale_monitor.last_inventory)
+        self.publish_api_state()
+        
+        self.status_var.set(f"Loaded {len(self.sale_monitor.item_prices)} prices and {len(self.sale_monitor.last_inventory)} items from cache")
+        self.debug_log_message("Restored character data from cache")
+        return True
+    
+    def save_state_cache(self):
+        """Save the parsed prices and inventory for the next warm start"""
+        if not self.sale_monitor.item_prices or not self.sale_monitor.file_fingerprints:
+            return
+        try:
+            save_cache(self.cache_file, 'trader_monitor', {
+                'character_name': self.character_name,
+                'root_directory': self.root_directory,
+                **self.sale_monitor.cache_state(),
+            })
+        except Exception as e:
+            self.debug_log_message(f"Error saving cache: {str(e)}")
         
     def on_character_change(self, event=None):
         """Update file paths when character name changes"""
@@ -284,6 +433,9 @@ class TraderMonitor:
         if self.character_name and self.root_directory:
             self.bzr_file = os.path.join(self.root_directory, f"BZR_{self.character_name}_pq.proj.ini")
             self.inventory_file = os.path.join(self.root_directory, f"{self.character_name}-Inventory.txt")
+            self.sale_monitor.trader = self.character_name
+            self.sale_monitor.inventory_file = self.inventory_file
+            self.sale_monitor.bzr_file = self.bzr_file
             
             # Update file status
             bzr_exists = os.path.exists(self.bzr_file)
@@ -357,18 +509,21 @@ class TraderMonitor:
             return
         
         try:
-            # Load BZR file (item prices)
-            self.item_prices = self.load_bzr_file()
-            self.debug_log_message(f"Loaded {len(self.item_prices)} items from BZR file")
+            # Load the BZR file (item prices) and the current inventory
+            self.sale_monitor.file_fingerprints = {}
+            self.sale_monitor.load()
+            self.debug_log_message(f"Loaded {len(self.sale_monitor.item_prices)} items from BZR file")
+            self.debug_log_message(f"Loaded {len(self.sale_monitor.last_inventory)} items from inventory")
             
-            # Load current inventory
-            self.last_inventory = self.load_inventory_file()
-            self.debug_log_message(f"Loaded {len(self.last_inventory)} items from inventory")
+            self.save_state_cache()
+            self.load_listing_ages()
+            self.save_listing_ages()
             
             # Update UI
-            self.update_items_display()
+            self.update_items_display(self.sale_monitor.last_inventory)
+            self.publish_api_state()
             
-            self.status_var.set(f"Loaded {len(self.item_prices)} prices from BZR file, found {len(self.last_inventory)} items in trader satchels")
+            self.status_var.set(f"Loaded {len(self.sale_monitor.item_prices)} prices from BZR file, found {len(self.sale_monitor.last_inventory)} items in trader satchels")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load files: {str(e)}")
@@ -419,66 +574,239 @@ class TraderMonitor:
         self.debug_log_message(f"Reading inventory file: {os.path.basename(self.inventory_file)}")
         
         if os.path.exists(self.inventory_file):
-            with open(self.inventory_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line_num, line in enumerate(f):
-                    line = line.strip()
-                    if line and '\t' in line:
-                        parts = line.split('\t')
-                        if len(parts) >= 3:
-                            slot = parts[0]
-                            item_name = parts[1]
-                            item_id = parts[2]
-                            
-                            # Track items in any General*-Slot* format (all trader satchel items)
-                            if re.match(r'General\d+-Slot\d+', slot) and item_name != 'Empty':
-                                items[slot] = (item_name, item_id)
-                                if len(items) <= 10:  # Debug first 10 items
-                                    self.debug_log_message(f"  {slot}: {item_name} (ID: {item_id})")
+            for slot, item_name, item_id in iter_inventory_items(self.inventory_file):
+                items[slot] = (item_name, item_id)
+                if len(items) <= 10:  # Debug first 10 items
+                    self.debug_log_message(f"  {slot}: {item_name} (ID: {item_id})")
         
         self.debug_log_message(f"Found {len(items)} items in all trader satchels")
         return items
     
-    def update_items_display(self):
+    def update_items_display(self, current_inventory=None):
         """Update the items for sale display"""
-        # Clear existing items
-        for item in self.items_tree.get_children():
-            self.items_tree.delete(item)
-        
         # Get current inventory items
-        current_inventory = self.load_inventory_file()
+        if current_inventory is None:
+            current_inventory = self.load_inventory_file()
         
         items_displayed = 0
         items_without_price = 0
+        rows = {}
+        now = time.time()
         
         # Display items currently in trader satchel
-        for i, (slot, (item_name, item_id)) in enumerate(current_inventory.items()):
+        for slot, (item_name, item_id) in current_inventory.items():
             # Check if item has a price in BZR file
-            if item_name in self.item_prices and self.item_prices[item_name] > 0:
-                price = self.item_prices[item_name]
-                price_str = f"{price:.1f} pp"  # Show platinum with 1 decimal place
-                
-                # Determine row tag for alternating colors
-                row_tag = 'oddrow' if i % 2 == 1 else 'evenrow'
-                
-                # Insert item with alternating row colors
-                self.items_tree.insert('', 'end', text=f"{item_name} (ID: {item_id})", 
-                                     values=(price_str, 'pqdi'), tags=(row_tag,))
+            if item_name in self.sale_monitor.item_prices and self.sale_monitor.item_prices[item_name] > 0:
+                # A slot's listing starts when its current item first shows up there; the monitor thread also updates the ages
+                with self.sale_monitor.lock:
+                    listed = self.sale_monitor.listing_ages.listed(slot, item_name, item_id, now)
+                rows[slot] = (item_name, item_id, self.sale_monitor.item_prices[item_name], listed)
                 items_displayed += 1
             else:
                 items_without_price += 1
-                if item_name in self.item_prices:
+                if item_name in self.sale_monitor.item_prices:
                     self.debug_log_message(f"Item has 0 price, ignoring: {item_name}")
                 else:
                     self.debug_log_message(f"Item not in price list, ignoring: {item_name}")
         
+        # Apply only the differences to the tree and the sorted views
+        removed = [slot for slot in self.display_rows if slot not in rows]
+        if removed:
+            self.items_tree.delete(*removed)
+            for view in self.sort_views.values():
+                for slot in removed:
+                    view.remove(slot)
+        
+        changed = []
+        for slot, row in rows.items():
+            if self.display_rows.get(slot) == row:
+                continue
+            item_name, item_id, price, listed = row
+            text = f"{item_name} (ID: {item_id})"
+            price_str = f"{price:.1f} pp"  # Show platinum with 1 decimal place
+            listed_str = datetime.fromtimestamp(listed).strftime("%m-%d %H:%M")
+            values = (price_str, item_id, slot, listed_str, 'pqdi')
+            if slot in self.display_rows:
+                self.items_tree.item(slot, text=text, values=values)
+            else:
+                self.items_tree.insert('', 'end', iid=slot, text=text, values=values)
+            for view in self.sort_views.values():
+                view.upsert(slot, row)
+            changed.append(slot)
+        
+        self.display_rows = rows
+        
+        # Only slots whose contents changed are re-indexed
+        self.item_index.update({slot: f"{row[0]}\t{row[1]}" for slot, row in rows.items()})
+        
+        if changed or removed:
+            self.place_changed_rows(changed)
+        
         self.debug_log_message(f"Displayed {items_displayed} items for sale")
         if items_without_price > 0:
             self.debug_log_message(f"Ignored {items_without_price} items without valid prices")
     
+    def place_changed_rows(self, changed):
+        """Move changed rows to their sorted position without touching the others"""
+        view = self.sort_views[self.sort_column]
+        if self.filter_var.get().strip() or self.stale_only_var.get() or len(changed) > 64:
+            self.apply_filter()
+            return
+        
+        # Unchanged rows are already in order; detach the changed ones and
+        # put them back in order of their final position
+        last = len(view) - 1
+        positions = sorted((last - view.index(slot) if self.sort_descending else view.index(slot), slot) for slot in changed)
+        if changed:
+            self.items_tree.detach(*changed)
+        for position, slot in positions:
+            self.items_tree.move(slot, '', position)
+        self.stripe_rows(view.order(self.sort_descending))
+    
+    def sort_items_by(self, column):
+        """Sort by a column heading; clicking the current column reverses the order"""
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        self.update_sort_headings()
+        self.apply_filter()
+    
+    def update_sort_headings(self):
+        for column, (heading, _) in SORT_COLUMNS.items():
+            if column == self.sort_column:
+                heading += " \u25bc" if self.sort_descending else " \u25b2"
+            self.items_tree.heading(column, text=heading)
+    
+    def stripe_rows(self, rows):
+        """Re-apply alternating row colors in a handful of Tk calls"""
+        tree = self.items_tree
+        tree.tk.call(tree, 'tag', 'remove', 'oddrow')
+        tree.tk.call(tree, 'tag', 'remove', 'evenrow')
+        if rows:
+            tree.tk.call(tree, 'tag', 'add', 'evenrow', rows[0::2])
+        if len(rows) > 1:
+            tree.tk.call(tree, 'tag', 'add', 'oddrow', rows[1::2])
+    
+    def apply_filter(self, *args):
+        """Show only the rows whose item name or ID contains the filter text, in sort order"""
+        order = self.sort_views[self.sort_column].order(self.sort_descending)
+        query = self.filter_var.get()
+        stale = self.stale_slots() if self.stale_only_var.get() else None
+        if not query.strip() and stale is None:
+            rows = order
+            self.filter_count_label.config(text="")
+        else:
+            matches = self.item_index.search(query) if query.strip() else None
+            rows = [slot for slot in order if (matches is None or slot in matches) and (stale is None or slot in stale)]
+            self.filter_count_label.config(text=f"{len(rows)} of {len(order)}")
+        self.items_tree.set_children('', *rows)
+        self.stripe_rows(rows)
+    
+    def listings_file(self):
+        return os.path.join(self.root_directory, listings_filename(self.character_name))
+    
+    def load_listing_ages(self):
+        """Restore the saved listing ages and match them to the current inventory"""
+        with self.sale_monitor.lock:
+            self.sale_monitor.listing_ages = ListingAges.load(self.listings_file())
+            self.sale_monitor.listing_ages.reconcile(self.sale_monitor.last_inventory, time.time())
+    
+    def save_listing_ages(self):
+        # An attached daemon keeps the listing ages itself
+        if self.daemon_client is not None or not self.character_name or not self.root_directory:
+            return
+        try:
+            with self.sale_monitor.lock:
+                self.sale_monitor.listing_ages.save(self.listings_file())
+        except Exception as e:
+            self.debug_log_message(f"Error saving listing ages: {str(e)}")
+    
+    def stale_cutoff(self):
+        """Listings first seen before the returned time are stale; None if the days box is invalid"""
+        try:
+            days = float(self.stale_days_var.get())
+        except ValueError:
+            return None
+        if days < 0:
+            return None
+        self.stale_settings['days'] = days
+        return time.time() - days * 24 * 3600
+    
+    def stale_slots(self):
+        cutoff = self.stale_cutoff()
+        if cutoff is None:
+            return set()
+        with self.sale_monitor.lock:
+            return {listing[0] for listing in self.sale_monitor.listing_ages.stale(cutoff)}
+    
+    def markdown_stale_listings(self):
+        """Propose markdowns for stale listings and write the accepted ones to the BZR file in one pass"""
+        if not self.bzr_file or not os.path.exists(self.bzr_file):
+            messagebox.showerror("Error", "Please load character data first")
+            return
+        
+        cutoff = self.stale_cutoff()
+        if cutoff is None:
+            messagebox.showerror("Error", "Please enter the stale age as a number of days")
+            return
+        try:
+            markdown_pct = float(self.markdown_pct_var.get())
+            if not 0 < markdown_pct < 100:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a markdown between 0 and 100 percent")
+            return
+        self.stale_settings['markdown_pct'] = markdown_pct
+        
+        with self.sale_monitor.lock:
+            stale = self.sale_monitor.listing_ages.stale(cutoff)
+        try:
+            proposals = propose_markdowns(stale, parse_bzr_items(self.bzr_file), markdown_pct)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read BZR file: {str(e)}")
+            return
+        if not proposals:
+            messagebox.showinfo("Mark Down Stale", f"No priced listings older than {self.stale_days_var.get()} days")
+            return
+        
+        now = time.time()
+        lines = [f"{item}: {current / 1000.0:.1f} -> {proposed / 1000.0:.1f} pp (listed {(now - first_seen) / 86400:.0f} days)"
+                 for item, (current, proposed, first_seen) in sorted(proposals.items(), key=lambda entry: entry[1][2])]
+        if len(lines) > 20:
+            lines = lines[:20] + [f"... and {len(lines) - 20} more"]
+        if not messagebox.askyesno("Mark Down Stale", f"Mark down {len(proposals)} items by {markdown_pct:g}%?\n\n" + "\n".join(lines)):
+            return
+        
+        # Markdowns go through the price book, so the next sync keeps them and other mules listing the items match
+        try:
+            book = PriceBook.load(self.root_directory)
+            applied = apply_markdowns(book, self.character_name, proposals)
+            book.save()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to write markdowns: {str(e)}")
+            self.debug_log_message(f"Error writing markdowns: {str(e)}")
+            return
+        
+        for item, (old_price, new_price) in sorted(applied.items()):
+            self.debug_log_message(f"Marked down {item}: {old_price} -> {new_price}")
+        try:
+            PriceJournal.open(self.root_directory).record(applied, SOURCE_MARKDOWN)
+        except Exception as e:
+            self.debug_log_message(f"Error writing price journal: {str(e)}")
+        
+        # Reload the prices that were just written
+        self.sale_monitor.reload_prices()
+        self.update_items_display(self.sale_monitor.last_inventory)
+        self.save_state_cache()
+        self.publish_api_state()
+        self.status_var.set(f"Marked down {len(applied)} stale items by {markdown_pct:g}%")
+    
     def toggle_monitoring(self):
         """Start or stop monitoring"""
         if not self.monitoring:
-            if not self.item_prices:
+            if not self.sale_monitor.item_prices:
                 messagebox.showerror("Error", "Please load character data first")
                 return
             
@@ -490,16 +818,22 @@ class TraderMonitor:
             # Start monitoring thread
             self.monitor_thread = threading.Thread(target=self.monitor_inventory, daemon=True)
             self.monitor_thread.start()
+            self.publish_api_state()
             
         else:
             self.monitoring = False
             self.monitor_button.config(text="Start Monitoring")
             self.status_var.set("Monitoring stopped")
             self.debug_log_message("Stopped monitoring")
+            self.publish_api_state()
     
     def manual_check(self):
         """Manually check for changes"""
-        if not self.item_prices:
+        if self.daemon_client is not None:
+            self.daemon_client.request('check')
+            return
+        
+        if not self.sale_monitor.item_prices:
             messagebox.showerror("Error", "Please load character data first")
             return
             
@@ -509,61 +843,30 @@ class TraderMonitor:
     
     def monitor_inventory(self):
         """Monitor inventory file for changes"""
-        last_modified = os.path.getmtime(self.inventory_file) if os.path.exists(self.inventory_file) else 0
-        self.debug_log_message(f"Monitoring started, file modified time: {last_modified}")
+        def on_change():
+            # File was modified, check for sold items
+            self.check_for_sales()
+            self.root.after(0, self.update_items_display)
         
-        while self.monitoring:
-            try:
-                if os.path.exists(self.inventory_file):
-                    current_modified = os.path.getmtime(self.inventory_file)
-                    
-                    if current_modified > last_modified:
-                        self.debug_log_message(f"File modified! Old: {last_modified}, New: {current_modified}")
-                        # File was modified, check for sold items
-                        self.check_for_sales()
-                        self.root.after(0, self.update_items_display)
-                        last_modified = current_modified
-                
-                time.sleep(2)  # Check every 2 seconds
-                
-            except Exception as e:
-                self.debug_log_message(f"Error monitoring file: {str(e)}")
-                break
+        watch_inventory(self.inventory_file, lambda: self.monitoring, on_change, log=self.debug_log_message)
     
     def check_for_sales(self):
-        """Check for items that were sold"""
+        """Check for items that were sold or restocked and publish them to the event bus"""
         try:
-            current_inventory = self.load_inventory_file()
-            
-            self.debug_log_message(f"Previous inventory: {len(self.last_inventory)} items")
-            self.debug_log_message(f"Current inventory: {len(current_inventory)} items")
-            
-            # Find slots that had items but are now empty (sold items)
-            sold_items = []
+            # Emptied or changed slots are sales of their old item; filled or changed slots are restocks
+            events, sold_items, restocked, prices_changed = self.sale_monitor.check()
             
-            for slot, (item_name, item_id) in self.last_inventory.items():
-                if slot not in current_inventory:
-                    # Item was removed from this slot (sold)
-                    sold_items.append((item_name, item_id))
-                    self.debug_log_message(f"Item sold from {slot}: {item_name} (ID: {item_id})")
+            # Sinks run on their own threads; publishing never waits for them
+            if events:
+                self.event_bus.publish_many(events)
             
-            self.debug_log_message(f"Items sold: {len(sold_items)}")
+            if sold_items or restocked:
+                self.save_listing_ages()
+            if sold_items or restocked or prices_changed:
+                self.save_state_cache()
+                self.publish_api_state()
             
-            if sold_items:
-                for item_name, item_id in sold_items:
-                    if item_name in self.item_prices and self.item_prices[item_name] > 0:
-                        price = self.item_prices[item_name]
-                        self.log_sale(f"SOLD: {item_name} (ID: {item_id}) for {price:.1f} platinum")
-                        self.debug_log_message(f"Sale logged: {item_name} for {price:.1f} platinum")
-                    else:
-                        if item_name in self.item_prices:
-                            self.debug_log_message(f"Sold item has 0 price, ignoring: {item_name}")
-                        else:
-                            self.debug_log_message(f"Sold item not in price list, ignoring: {item_name}")
-                
-                # Update last inventory
-                self.last_inventory = current_inventory.copy()
-            else:
+            if not sold_items:
                 self.debug_log_message("No sales detected")
                 
         except Exception as e:
@@ -571,6 +874,123 @@ class TraderMonitor:
             self.log_sale(error_msg)
             self.debug_log_message(error_msg)
     
+    def toggle_daemon_attach(self):
+        """Attach to a running monitor daemon, or detach from it"""
+        if self.daemon_client is not None:
+            self.daemon_client.close()
+            return
+        
+        if self.monitoring:
+            messagebox.showerror("Error", "Stop monitoring before attaching to the daemon")
+            return
+        
+        from monitor_daemon import DaemonClient
+        # The daemon writes the ledger and runs the sinks; the window only shows its sales
+        sale_sinks = [TextLogSink(self.log_sale), DebugSink(self.debug_log_message)]
+        def on_events(events):
+            for sink in sale_sinks:
+                sink(events)
+        
+        client = DaemonClient(lambda state: self.root.after(0, self.apply_daemon_snapshot, state), on_events,
+                              lambda error: self.root.after(0, self.daemon_detached, error),
+                              port=self.daemon_settings['port'])
+        try:
+            client.connect()
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not reach the monitor daemon on port {self.daemon_settings['port']}:\n{str(e)}")
+            return
+        
+        self.daemon_client = client
+        with self.sale_monitor.lock:
+            self.sale_monitor.listing_ages = ListingAges.load(self.listings_file())
+        self.attach_button.config(text="Detach")
+        self.monitor_button.state(['disabled'])
+        self.debug_log_message(f"Attached to monitor daemon on port {self.daemon_settings['port']}")
+    
+    def apply_daemon_snapshot(self, state):
+        """Show the daemon's prices and inventory"""
+        if self.daemon_client is None:
+            return
+        # The daemon ran the check; the window's SaleMonitor just holds what it found
+        with self.sale_monitor.lock:
+            self.sale_monitor.item_prices = state['prices']
+            self.sale_monitor.last_inventory = {slot: (item['item'], item['item_id']) for slot, item in state['inventory'].items()}
+            self.sale_monitor.last_change_time = state['status'].get('last_change')
+            self.sale_monitor.listing_ages.reconcile(self.sale_monitor.last_inventory, time.time())
+        self.update_items_display(self.sale_monitor.last_inventory)
+        self.publish_api_state()
+        self.status_var.set(f"Attached to daemon monitoring {state['status'].get('character_name', '')}: "
+                            f"{len(self.sale_monitor.item_prices)} prices, {len(self.sale_monitor.last_inventory)} items in trader satchels")
+    
+    def daemon_detached(self, error):
+        self.daemon_client = None
+        self.attach_button.config(text="Attach to Daemon")
+        self.monitor_button.state(['!disabled'])
+        if error is None:
+            self.status_var.set("Detached from the monitor daemon")
+        else:
+            self.status_var.set(f"Lost the monitor daemon: {str(error)}")
+        self.debug_log_message(self.status_var.get())
+    
+    def setup_event_sinks(self):
+        """Attach the configured sale sinks to the event bus"""
+        self.event_bus.subscribe(TextLogSink(self.log_sale), name="sales log")
+        self.event_bus.subscribe(DebugSink(self.debug_log_message), name="debug log")
+        self.event_bus.subscribe(LedgerSink(lambda trader: os.path.join(self.root_directory, sales_ledger_filename(trader))), name="ledger")
+        if self.sink_settings['notifications']:
+            self.event_bus.subscribe(NotificationSink(), name="notifications", maxsize=100)
+        if self.sink_settings['webhook_url']:
+            self.event_bus.subscribe(WebhookSink(self.sink_settings['webhook_url']), name="webhook")
+        if self.sink_settings['socket_address']:
+            host, _, port = self.sink_settings['socket_address'].rpartition(':')
+            try:
+                self.event_bus.subscribe(SocketSink(host or '127.0.0.1', int(port)), name="socket")
+            except ValueError:
+                self.debug_log_message(f"Invalid socket_address: {self.sink_settings['socket_address']}")
+    
+    def start_api_server(self):
+        """Start the local JSON API if it is enabled in the config"""
+        if not self.api_settings['enabled']:
+            return
+        from local_api import LocalApiServer, StateStore
+        self.api_store = StateStore()
+        try:
+            self.api_server = LocalApiServer(self.api_store, port=self.api_settings['port']).start()
+        except OSError as e:
+            self.api_store = None
+            self.debug_log_message(f"Could not start local API on port {self.api_settings['port']}: {str(e)}")
+            return
+        self.event_bus.subscribe(self.record_api_sales, name="local api")
+        self.debug_log_message(f"Local API listening on http://127.0.0.1:{self.api_settings['port']}/")
+    
+    def record_api_sales(self, events):
+        """Event sink feeding the /sales endpoint"""
+        sales = [event_to_dict(event) for event in events if event.kind == SALE]
+        if sales:
+            self.api_store.record_sales(sales)
+            self.publish_api_state()
+    
+    def publish_api_state(self):
+        """Hand the API a fresh snapshot; the store reads the state under its lock"""
+        if self.api_store is None:
+            return
+        self.api_store.publish(self.api_state)
+    
+    def api_state(self):
+        return self.sale_monitor.item_prices, self.sale_monitor.last_inventory, {
+            'character_name': self.character_name,
+            'monitoring': self.monitoring,
+            'items_priced': len(self.sale_monitor.item_prices),
+            'items_in_satchels': len(self.sale_monitor.last_inventory),
+            'last_change': self.sale_monitor.last_change_time,
+            'bzr_file': self.bzr_file,
+            'inventory_file': self.inventory_file,
+        }
+    
+    def on_sink_error(self, name, error):
+        """Report a failing sink without affecting detection"""
+        self.debug_log_message(f"Sink '{name}' failed: {str(error)}")
+    
     def log_sale(self, message):
         """Add a message to the sales log"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -587,24 +1007,8 @@ class TraderMonitor:
 
 def main():
     try:
-        # Test basic imports first
-        print("Starting Trader Monitor...")
-        print("Testing imports...")
-        
-        import tkinter as tk
-        from tkinter import ttk, filedialog, messagebox, scrolledtext
-        print("Tkinter imports successful")
-        
-        import configparser
-        print("ConfigParser import successful")
-        
-        print("Creating main window...")
         root = tk.Tk()
-        print("Main window created")
-        
-        print("Initializing TraderMonitor...")
         app = TraderMonitor(root)
-        print("TraderMonitor initialized")
         
         # Set window icon (optional)
         try:
@@ -612,16 +1016,22 @@ def main():
         except:
             pass
         
-        # Save config on window close
+        # Save config and cached state on window close
         def on_closing():
             try:
                 app.save_config()
+                app.save_state_cache()
+                app.save_listing_ages()
+                app.event_bus.close()
+                if app.daemon_client is not None:
+                    app.daemon_client.close()
+                if app.api_server is not None:
+                    app.api_server.stop()
             except Exception as e:
                 print(f"Error saving config: {e}")
             root.destroy()
         
         root.protocol("WM_DELETE_WINDOW", on_closing)
-        print("Starting main loop...")
         root.mainloop()
         
     except Exception as e:
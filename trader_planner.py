@@ -0,0 +1,100 @@
+"""Plan how items are spread across several trader mules"""
+import heapq
+from collections import Counter
+
+WEIGHT_VALUE = "Listed value"
+WEIGHT_SELL_THROUGH = "Sell-through"
+WEIGHT_MODES = (WEIGHT_VALUE, WEIGHT_SELL_THROUGH)
+
+class DistributionPlan:
+    def __init__(self, traders):
+        self.assignments = {trader: Counter() for trader in traders}  # trader -> {item: units}
+        self.loads = {trader: 0.0 for trader in traders}
+        self.unplaced = Counter()  # item -> units that did not fit
+        self.unstocked = []  # priced items with no units in any inventory
+        self.moves = []  # (item, from trader, to trader, units) to carry out in game
+    
+    def slots_used(self, trader):
+        return sum(self.assignments[trader].values())
+
+def stock_counts(inventories):
+    """Count the units of each item across {trader: {slot: (item_name, item_id)}}"""
+    counts = Counter()
+    for inventory in inventories.values():
+        for item_name, _ in inventory.values():
+            counts[item_name] += 1
+    return counts
+
+def holdings(inventories):
+    """Count the units of each item per trader: {trader: Counter(item: units)}"""
+    return {trader: Counter(item_name for item_name, _ in inventory.values()) for trader, inventory in inventories.items()}
+
+def unit_weight(price, mode, units=1, sold=0):
+    """Weight of one unit: its price, or its price times the smoothed share of units that sold"""
+    if mode == WEIGHT_SELL_THROUGH:
+        return price * (sold + 1) / (sold + units + 2)
+    return float(price)
+
+def plan_distribution(prices, stock, capacities, mode=WEIGHT_VALUE, sales=None, held=None):
+    """Assign stocked units of priced items to {trader: free slots}; stock None means one unit of each"""
+    # held is {trader: {item: units}}; units stay on the trader holding them while it has room
+    plan = DistributionPlan(capacities)
+    sales = sales or {}
+    held = held or {}
+    priced = {item: price for item, price in prices.items() if price > 0}
+    if stock is None:
+        stock = {item: 1 for item in priced}
+    plan.unstocked = sorted(item for item in priced if not stock.get(item))
+    
+    weights = {item: unit_weight(priced[item], mode, count, sales.get(item, 0))
+               for item, count in stock.items() if item in priced and count > 0}
+    remaining = Counter({item: stock[item] for item in weights})
+    free = {trader: capacity for trader, capacity in capacities.items() if capacity > 0}
+    for trader in sorted(free):
+        # Heaviest first; ties by name keep the plan stable between runs
+        for item in sorted(held.get(trader, ()), key=lambda item: (-weights.get(item, 0), item)):
+            keep = min(held[trader][item], remaining[item], free[trader])
+            if item not in weights or keep <= 0:
+                continue
+            plan.assignments[trader][item] += keep
+            plan.loads[trader] += weights[item] * keep
+            remaining[item] -= keep
+            free[trader] -= keep
+    
+    units = []
+    for item, count in remaining.items():
+        units.extend([(weights[item], item)] * count)
+    units.sort(key=lambda unit: (-unit[0], unit[1]))
+    
+    heap = [(plan.loads[trader], trader) for trader in sorted(free) if free[trader] > 0]
+    heapq.heapify(heap)
+    for weight, item in units:
+        if not heap:
+            plan.unplaced[item] += 1
+            continue
+        load, trader = heapq.heappop(heap)
+        plan.assignments[trader][item] += 1
+        load += weight
+        plan.loads[trader] = load
+        free[trader] -= 1
+        if free[trader] > 0:
+            heapq.heappush(heap, (load, trader))
+    plan.moves = _moves(plan.assignments, held)
+    return plan
+
+def _moves(assignments, held):
+    # Units a trader holds beyond its assignment go to the traders assigned more than they hold
+    moves = []
+    for item in sorted({item for counts in assignments.values() for item in counts}):
+        surplus = [[trader, counts[item] - assignments.get(trader, Counter())[item]]
+                   for trader, counts in sorted(held.items()) if counts[item] > assignments.get(trader, Counter())[item]]
+        for trader, counts in sorted(assignments.items()):
+            missing = counts[item] - held.get(trader, Counter())[item]
+            while missing > 0 and surplus:
+                units = min(missing, surplus[0][1])
+                moves.append((item, surplus[0][0], trader, units))
+                missing -= units
+                surplus[0][1] -= units
+                if not surplus[0][1]:
+                    surplus.pop(0)
+    return moves
@@ -0,0 +1,35 @@
+"""Versioned on-disk cache of the last parsed state, used to start warm"""
+import json
+import os
+
+CACHE_VERSION = 1
+
+def file_fingerprint(path):
+    """Return [mtime_ns, size] for a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def fingerprints_match(fingerprints):
+    """Return True if every {path: fingerprint} entry still matches the disk"""
+    return all(file_fingerprint(path) == fingerprint for path, fingerprint in fingerprints.items())
+
+def load_cache(cache_file, kind):
+    """Read a cache in one go; returns its state dict, or None if unusable"""
+    try:
+        with open(cache_file, 'rb') as f:
+            data = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != CACHE_VERSION or data.get('kind') != kind:
+        return None
+    return data.get('state')
+
+def save_cache(cache_file, kind, state):
+    """Atomically replace a cache with a new state dict"""
+    temp_file = cache_file + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'kind': kind, 'state': state}, f, separators=(',', ':'))
+    os.replace(temp_file, cache_file)